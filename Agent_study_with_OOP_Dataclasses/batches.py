@@ -0,0 +1,103 @@
+# ===============================================================
+# RectangleBatch and PersonBatch: many objects, one NumPy call
+# ===============================================================
+# Rectangle.area(), Rectangle.perimeter() and Person.calculate_birth_year() work on one
+# object at a time, so a large record set needs a Python loop. These batch classes keep
+# the same data as NumPy columns (one array per field) and compute the result for every
+# record in a single vectorized call.
+#
+#   batch = RectangleBatch.from_objects(rectangles)   # list of Rectangle -> columns
+#   areas = batch.area()                              # NumPy array, one value per rectangle
+#   rectangles = batch.to_objects(Rectangle)          # columns -> list of Rectangle
+#
+# The batches only read and set the attributes (length/width, name/age), so they work with
+# the dataclass and the plain-class versions of Rectangle and Person alike.
+#
+# This file does not import 'dataclasses' on purpose: the example next to it is
+# called dataclasses.py and would be imported instead of the standard library.
+
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the batch examples
+    raise ImportError("The batch examples need numpy: uv sync --extra batches (or pip install numpy)") from None
+
+
+class RectangleBatch:
+    """Rectangles stored as two columns: length and width (float64 arrays)."""
+
+    def __init__(self, length, width):
+        self.length = np.asarray(length, dtype=np.float64)
+        self.width = np.asarray(width, dtype=np.float64)
+        if self.length.shape != self.width.shape:
+            raise ValueError("length and width must have the same shape")
+
+    @classmethod
+    def from_objects(cls, rectangles):
+        """Builds a batch from Rectangle objects (anything with .length and .width)."""
+        rectangles = list(rectangles)
+        n = len(rectangles)
+        return cls(
+            np.fromiter(map(attrgetter("length"), rectangles), dtype=np.float64, count=n),
+            np.fromiter(map(attrgetter("width"), rectangles), dtype=np.float64, count=n),
+        )
+
+    def to_objects(self, rectangle_class):
+        """Turns the batch back into a list of rectangle_class(length, width) objects."""
+        # tolist() gives plain Python floats, like the ones the objects were made from.
+        return [rectangle_class(length, width) for length, width in zip(self.length.tolist(), self.width.tolist())]
+
+    def area(self):
+        """Area of every rectangle (same as Rectangle.area, for the whole batch)."""
+        return self.length * self.width
+
+    def perimeter(self):
+        """Perimeter of every rectangle (same as Rectangle.perimeter)."""
+        return 2 * (self.length + self.width)
+
+    def __len__(self):
+        return len(self.length)
+
+    def __getitem__(self, index):
+        """A slice or a boolean mask gives a smaller batch, e.g. batch[batch.area() > 100]."""
+        return RectangleBatch(self.length[index], self.width[index])
+
+
+class PersonBatch:
+    """People stored as columns: names (a Python list) and ages (an int64 array)."""
+
+    def __init__(self, names, ages):
+        self.names = list(names)
+        self.ages = np.asarray(ages, dtype=np.int64)
+        if len(self.names) != len(self.ages):
+            raise ValueError("names and ages must have the same length")
+
+    @classmethod
+    def from_objects(cls, people):
+        """Builds a batch from Person objects (anything with .name and .age)."""
+        people = list(people)
+        return cls(
+            [person.name for person in people],
+            np.fromiter(map(attrgetter("age"), people), dtype=np.int64, count=len(people)),
+        )
+
+    def to_objects(self, person_class):
+        """Turns the batch back into a list of person_class(name, age) objects."""
+        return [person_class(name, age) for name, age in zip(self.names, self.ages.tolist())]
+
+    def birth_years(self, current_year):
+        """Birth year of every person (same as Person.calculate_birth_year)."""
+        return current_year - self.ages
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        """A slice or a boolean mask gives a smaller batch, e.g. batch[batch.ages >= 18]."""
+        ages = self.ages[index]
+        if isinstance(index, slice):
+            names = self.names[index]
+        else:
+            names = np.asarray(self.names, dtype=object)[index].tolist()
+        return PersonBatch(names, ages)
@@ -0,0 +1,258 @@
+# ===============================================================
+# BookRegistry: an indexed home for Book objects
+# ===============================================================
+# The Book examples used to keep every book in a class-level list:
+#   - the list never shrinks, so books are never freed
+#   - finding books by author, title or year means scanning the whole list
+# BookRegistry fixes both:
+#   - it holds weak references: when a book is no longer used anywhere else,
+#     Python frees it and the registry forgets it automatically
+#   - hash indexes on author and title make those lookups O(1)
+#   - a year index (one bucket per year plus a sorted list of the years, searched
+#     with bisect) answers range questions like "published before 1970" without a scan
+#   - len(registry) is O(1)
+#
+# Note: books are indexed by their values when they are added. If you change
+# a book's title, author or year afterwards, call registry.reindex(book).
+#
+# This file does not import 'dataclasses' on purpose: the example next to it is
+# called dataclasses.py and would be imported instead of the standard library.
+
+from bisect import bisect_left, insort
+from itertools import count
+import gc
+import weakref
+
+
+class BookRegistry:
+    """
+    Keeps track of live books without keeping them alive.
+    Works with any object that has 'title', 'author' and 'year' attributes.
+    Results come back in the order the books were added.
+    """
+
+    def __init__(self):
+        # key -> weak reference to the book
+        self._refs = {}
+        # id(book) -> key, so a book can be found again (reindex, remove)
+        self._keys = {}
+        # author -> keys, title -> keys, year -> keys (see _add_key for the format)
+        self._by_author = {}
+        self._by_title = {}
+        self._by_year = {}
+        # The distinct years, sorted, for range queries
+        self._years = []
+        # key -> (title, author, year, id(book)) the book was indexed with
+        self._indexed = {}
+        self._next_key = count()
+        # Goes up on every change, so caches built on top of the registry know when to refresh.
+        self.version = 0
+        # Keys of books that were garbage collected but are not cleaned up yet
+        self._dead = []
+        dead = self._dead
+        # One shared callback (no reference back to self, so the registry itself can be freed).
+        self._on_dead = lambda ref: dead.append(ref.key)
+
+    # ---------- adding and removing ----------
+
+    def add(self, book):
+        """Adds one book, O(1) (plus O(log y) the first time its year is seen)."""
+        self._purge()
+        self._register(book)
+        return book
+
+    def add_many(self, books):
+        """Adds many books at once and returns how many were added."""
+        self._purge()
+        added = 0
+        # A bulk load creates millions of small objects; pausing the cyclic garbage
+        # collector meanwhile saves it from scanning them again and again.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for book in books:
+                self._register(book)
+                added += 1
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return added
+
+    def _register(self, book):
+        key = next(self._next_key)
+        # The callback runs when the book is garbage collected. It only notes the key:
+        # the real clean-up happens at the next registry call, never in the middle of one.
+        self._refs[key] = weakref.KeyedRef(book, self._on_dead, key)
+        self._keys[id(book)] = key
+        self._index(key, book.title, book.author, book.year, id(book))
+
+    def _index(self, key, title, author, year, object_id):
+        self.version += 1
+        self._indexed[key] = (title, author, year, object_id)
+        _add_key(self._by_author, author, key)
+        _add_key(self._by_title, title, key)
+        if year not in self._by_year:
+            insort(self._years, year)
+        _add_key(self._by_year, year, key)
+
+    def _unindex(self, key):
+        self.version += 1
+        title, author, year, object_id = self._indexed.pop(key)
+        _remove_key(self._by_author, author, key)
+        _remove_key(self._by_title, title, key)
+        _remove_key(self._by_year, year, key)
+        if year not in self._by_year:
+            del self._years[bisect_left(self._years, year)]
+        return object_id
+
+    def _purge(self):
+        """Forgets the books that were garbage collected since the last call."""
+        while self._dead:
+            key = self._dead.pop()
+            if self._refs.pop(key, None) is not None:
+                object_id = self._unindex(key)
+                # The id of a dead object can be reused by a new one, so only drop our own entry.
+                if self._keys.get(object_id) == key:
+                    del self._keys[object_id]
+
+    def remove(self, book):
+        """Removes a book before it is garbage collected (e.g. it was withdrawn)."""
+        self._purge()
+        key = self._key_of(book)
+        del self._refs[key]
+        del self._keys[id(book)]
+        self._unindex(key)
+
+    def reindex(self, book):
+        """Updates the indexes after the book's title, author or year was changed."""
+        self._purge()
+        key = self._key_of(book)
+        self._unindex(key)
+        self._index(key, book.title, book.author, book.year, id(book))
+
+    def _key_of(self, book):
+        key = self._keys.get(id(book))
+        if key is None or key not in self._refs or self._refs[key]() is not book:
+            raise KeyError(f"{book!r} is not in the registry")
+        return key
+
+    # ---------- queries ----------
+
+    def __len__(self):
+        """Number of live books, O(1)."""
+        return len(self._refs) - len(self._dead)
+
+    def total(self):
+        return len(self)
+
+    def __iter__(self):
+        self._purge()
+        return iter(self._books(list(self._refs)))
+
+    def _books(self, keys):
+        # Right after _purge() every key is in _refs; a book may still die in between (ref() is None).
+        refs = self._refs
+        return [book for key in keys if (book := refs[key]()) is not None]
+
+    def _year_range(self, first_year, last_year):
+        """The indexed years with first_year <= year <= last_year (None means no limit)."""
+        start = 0 if first_year is None else bisect_left(self._years, first_year)
+        end = len(self._years) if last_year is None else bisect_left(self._years, last_year + 1)
+        return self._years[start:end]
+
+    def by_author(self, author):
+        self._purge()
+        return self._books(_get_keys(self._by_author, author))
+
+    def by_title(self, title):
+        self._purge()
+        return self._books(_get_keys(self._by_title, title))
+
+    def published_between(self, first_year, last_year):
+        """Books with first_year <= year <= last_year."""
+        self._purge()
+        by_year = self._by_year
+        years = self._year_range(first_year, last_year)
+        if not years:
+            return []
+        matches = sum(_count_keys(by_year, year) for year in years)
+        if matches * 4 > len(self._refs):
+            # Most of the library matches: one pass in the order the books were added is
+            # faster than jumping around memory through the index.
+            first, last, refs = years[0], years[-1], self._refs
+            return [book for key, entry in self._indexed.items()
+                    if first <= entry[2] <= last and (book := refs[key]()) is not None]
+        # Sorting the keys keeps the results in the order the books were added.
+        return self._books(sorted(key for year in years for key in _get_keys(by_year, year)))
+
+    def published_before(self, year):
+        """Books published before `year` (e.g. the classics: published_before(1970))."""
+        return self.published_between(None, year - 1)
+
+    def count_between(self, first_year, last_year):
+        """How many books fall in the year range, without building a list of them."""
+        self._purge()
+        return sum(_count_keys(self._by_year, year) for year in self._year_range(first_year, last_year))
+
+    def count_before(self, year):
+        return self.count_between(None, year - 1)
+
+    # ---------- bulk queries ----------
+
+    def by_authors(self, authors):
+        """{author: [books]} for many authors in one call."""
+        return {author: self.by_author(author) for author in authors}
+
+    def by_titles(self, titles):
+        """{title: [books]} for many titles in one call."""
+        return {title: self.by_title(title) for title in titles}
+
+    def count_by_author(self):
+        """{author: number of books} for every author, without touching the books."""
+        self._purge()
+        return {author: _count_keys(self._by_author, author) for author in self._by_author}
+
+    def count_by_year(self):
+        """{year: number of books}, oldest year first."""
+        self._purge()
+        return {year: _count_keys(self._by_year, year) for year in self._years}
+
+
+# ---------- index helpers ----------
+# An index maps a value (author, title or year) to the keys of its books. Most titles
+# belong to a single book, so one key is stored as a plain int; a second key turns the
+# entry into a dict used as an ordered set ({key: None, ...}). This keeps 1M unique
+# titles from costing 1M small dicts.
+
+def _add_key(index, value, key):
+    current = index.get(value)
+    if current is None:
+        index[value] = key
+    elif type(current) is dict:
+        current[key] = None
+    else:
+        index[value] = {current: None, key: None}
+
+
+def _remove_key(index, value, key):
+    current = index[value]
+    if type(current) is dict:
+        del current[key]
+        if len(current) == 1:
+            index[value] = next(iter(current))
+    else:
+        del index[value]
+
+
+def _get_keys(index, value):
+    current = index.get(value)
+    if current is None:
+        return ()
+    return current if type(current) is dict else (current,)
+
+
+def _count_keys(index, value):
+    current = index.get(value)
+    if current is None:
+        return 0
+    return len(current) if type(current) is dict else 1
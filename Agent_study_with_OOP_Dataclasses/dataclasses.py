@@ -51,17 +51,20 @@ print("MyDataclass static method 'sum_num':", MyDataclass.sum_num(10, 20)) # Out
 # EXAMPLE 1: Book Library Dataclass
 # ===============================================================
 
-from typing import List
+from book_registry import BookRegistry
 
 @dataclass
 class Book:
     """
     A Book dataclass that:
     - Has instance variables for title, author, and year.
-    - Uses a class variable to store all books in a library.
+    - Uses a class variable to keep track of all books in a library.
     """
-    # Class variable: A list that stores all Book instances.
-    library: ClassVar[List['Book']] = []
+    # Class variable: a BookRegistry (see book_registry.py) that indexes all Book instances.
+    # Note: it only holds weak references. The class used to keep a plain list, which kept every
+    # book alive forever; now a book that no variable (or list, dict, ...) refers to any more is
+    # freed and leaves the library, so it no longer counts in total_books() or shows up in lookups.
+    library: ClassVar[BookRegistry] = BookRegistry()
     
     # Instance variables for each Book.
     title: str
@@ -73,7 +76,7 @@ class Book:
         __post_init__ is automatically called after __init__.
         Here, we add the new Book instance to the library.
         """
-        Book.library.append(self)
+        Book.library.add(self)
     
     def description(self):
         """
@@ -85,6 +88,7 @@ class Book:
     def total_books(cls):
         """
         Class method to return the total number of books in the library.
+        The registry keeps a count, so this does not loop over the books.
         """
         return len(cls.library)
     
@@ -107,9 +111,17 @@ print("Book Description:", book2.description())      # Output: 'Python Programmi
 # Using class method:
 print("Total books in library:", Book.total_books()) # Output: Total books in library: 2
 
+# A book that nothing refers to is freed at once and leaves the library (weak references):
+Book("Draft", "Nobody")                               # not stored in a variable
+print("Total books in library:", Book.total_books()) # Output: Total books in library: 2 (not 3)
+
 # Using static method:
 print("Is '1984' a classic?", Book.is_classic(book1.year))  # Output: True
 
+# Using the library's indexes (no loop over all books):
+print("Books by George Orwell:", [b.title for b in Book.library.by_author("George Orwell")])  # Output: ['1984']
+print("Classics in the library:", Book.library.count_before(1970))  # Output: 1
+
 # ===============================================================
 # EXAMPLE 2: Rectangle Dataclass
 # ===============================================================
@@ -4,6 +4,9 @@
 # No need for 'dataclasses' or 'typing' imports in normal OOP for this example.
 # In @dataclass, we needed 'from dataclasses import dataclass' and sometimes 'from typing import ClassVar, List'.
 
+# The Book library is an indexed registry that lives next to this file (book_registry.py).
+from book_registry import BookRegistry
+
 # Example 1: MyDataclass
 class MyDataclass:
     """
@@ -50,12 +53,14 @@ class Book:
     """
     A Book class that:
     - Has instance variables for title, author, and year.
-    - Uses a class variable to store all books in a library.
+    - Uses a class variable to keep track of all books in a library.
     """
-    # Class variable: A list to store all Book objects.
-    # Difference: In @dataclass, this was 'library: ClassVar[List["Book"]] = []'.
+    # Class variable: a BookRegistry (see book_registry.py) that indexes all Book objects
+    # by author, title and year. Note: it only holds weak references, so a book that no variable
+    # refers to any more is freed and leaves the library (total_books() and lookups skip it).
+    # Difference: In @dataclass, this was 'library: ClassVar[BookRegistry] = BookRegistry()'.
     # In normal OOP, we define it directly without 'ClassVar'.
-    library = []
+    library = BookRegistry()
 
     # Constructor: Initializes instance variables and adds the book to the library.
     # Difference: In @dataclass, '__init__' is auto-generated, and extra setup (like adding to library)
@@ -65,7 +70,7 @@ class Book:
         self.author = author  # Instance variable
         self.year = year      # Instance variable with a default value
         # This line mimics what '__post_init__' did in @dataclass.
-        Book.library.append(self)
+        Book.library.add(self)
 
     # Instance Method: Describes the book.
     # Difference: No change; instance methods work the same way.
@@ -169,7 +174,10 @@ if __name__ == "__main__":
     book2 = Book("OOP Basics", "Jane Smith", 2019)
     print(book1.description())          # Output: 'Python 101' by John Doe (2020)
     print(Book.total_books())           # Output: 2
+    Book("Draft", "Nobody")             # not stored in a variable, so it is freed at once
+    print(Book.total_books())           # Output: 2 (the library only holds weak references)
     print(Book.is_classic(book2.year))  # Output: False
+    print([b.title for b in Book.library.by_author("Jane Smith")])  # Output: ['OOP Basics']
 
     # Test Rectangle
     rect = Rectangle(5.0, 3.0)
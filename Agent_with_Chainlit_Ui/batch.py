@@ -0,0 +1,161 @@
+# This code is part of the Agent with UI project.
+# Runs a JSONL file of prompts through an agent, for regression tests and evals.
+#
+# Usage:
+#   python batch.py prompts.jsonl results.jsonl --concurrency 16 --rpm 300 --tpm 200000
+#
+# Every input line is {"id": "...", "prompt": "..."} ("id" defaults to the line number).
+# Results are appended to the output file as they finish, one JSON line each.
+# Running the same command again resumes: prompts that already have a result are skipped.
+# Failed calls are retried here (--max-retries), not by the HTTP client, so every attempt
+# passes the rate limiter.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+
+from history import count_tokens
+from ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def read_prompts(path: str):
+    """Yields (id, prompt) pairs one line at a time, so huge files are never fully loaded."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            prompt = record.get("prompt", record.get("input"))
+            yield str(record.get("id", number)), prompt
+
+
+def completed_ids(path: str) -> set:
+    """Ids that already have a successful result in the output file (the checkpoint)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by a crash; that prompt runs again
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+def is_retryable(error: Exception) -> bool:
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+async def run_one(agent, prompt, limiter: RateLimiter, max_retries: int, output_estimate: int):
+    from agents import Runner
+
+    estimate = count_tokens(str(prompt)) + output_estimate
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(estimate)
+        try:
+            result = await Runner.run(starting_agent=agent, input=prompt)
+        except Exception as error:
+            if attempt == max_retries or not is_retryable(error):
+                raise
+            # Exponential backoff with full jitter.
+            delay = random.uniform(0, min(1.0 * 2 ** attempt, 60.0))
+            logger.warning("Retrying after %s (attempt %d, sleeping %.1fs)", error, attempt + 1, delay)
+            await asyncio.sleep(delay)
+            continue
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        for response in result.raw_responses:
+            usage["input_tokens"] += response.usage.input_tokens
+            usage["output_tokens"] += response.usage.output_tokens
+        limiter.record_usage(estimate, usage["input_tokens"] + usage["output_tokens"])
+        return str(result.final_output), usage, attempt
+
+
+async def run_batch(agent, prompts_path: str, output_path: str, concurrency: int = 8,
+                    requests_per_minute: float | None = None, tokens_per_minute: float | None = None,
+                    max_retries: int = 5, output_estimate: int = 500) -> dict:
+    """
+    Runs every prompt of prompts_path through the agent and appends the results to output_path.
+    At most `concurrency` runs are in flight, and only that many prompts are held in memory.
+    Retries are done here, each one through the rate limiter: give the agent a client with
+    max_retries=0 (main() does), or every attempt here may hide more calls made by the client.
+    """
+    done = completed_ids(output_path)
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {"ok": 0, "failed": 0, "skipped": 0}
+    started = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker(prompt_id, prompt):
+            t0 = time.monotonic()
+            try:
+                output, usage, retries = await run_one(agent, prompt, limiter, max_retries, output_estimate)
+                record = {"id": prompt_id, "output": output, "usage": usage, "retries": retries}
+                summary["ok"] += 1
+            except Exception as error:
+                record = {"id": prompt_id, "error": f"{type(error).__name__}: {error}"}
+                summary["failed"] += 1
+            finally:
+                semaphore.release()
+            record["latency_s"] = round(time.monotonic() - t0, 3)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        tasks = set()
+        for prompt_id, prompt in read_prompts(prompts_path):
+            if prompt_id in done:
+                summary["skipped"] += 1
+                continue
+            await semaphore.acquire()
+            task = asyncio.create_task(worker(prompt_id, prompt))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    summary["elapsed_s"] = round(time.monotonic() - started, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL prompt set through an agent.")
+    parser.add_argument("prompts", help="input JSONL file with id/prompt records")
+    parser.add_argument("output", help="output JSONL file (appended to; also the resume checkpoint)")
+    parser.add_argument("--agent", default=None, help="registered agent name (default: the support agent)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=None, help="requests per minute limit")
+    parser.add_argument("--tpm", type=float, default=None, help="tokens per minute limit")
+    parser.add_argument("--max-retries", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # The batch retries on its own, through the rate limiter; the HTTP client must not retry as well
+    # (read by provider.ProviderConfig.from_env when the model is built).
+    os.environ["AGENT_HTTP_MAX_RETRIES"] = "0"
+    from main import registry, SUPPORT_AGENT_NAME
+
+    async def go():
+        agent = await registry.get(args.agent or SUPPORT_AGENT_NAME)
+        return await run_batch(agent, args.prompts, args.output, args.concurrency,
+                               args.rpm, args.tpm, args.max_retries)
+
+    print(json.dumps(asyncio.run(go())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# This code is part of the Agent with UI project.
+# Response cache in front of Runner.run / Runner.run_streamed for repeated support questions.
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from prompt import canonical_tools
+from streaming import text_deltas
+from semantic_cache import SemanticCache, standalone_question
+
+logger = logging.getLogger(__name__)
+
+# Size of the pieces a cached answer is replayed in, so it streams like a live answer.
+REPLAY_CHUNK_CHARS = 64
+
+
+def normalize_history(items) -> list:
+    """
+    Collapses whitespace, so trivially different inputs share a cache entry. Case is kept:
+    codes, ids and names are case-sensitive, and "ABC-1" and "abc-1" may need different answers.
+    """
+    if isinstance(items, str):
+        items = [{"role": "user", "content": items}]
+    return [
+        [item.get("role", ""), " ".join(str(item.get("content", "")).split())]
+        for item in items
+    ]
+
+
+def tool_schemas(agent) -> list:
+    """Name, description and JSON schema of every tool, in canonical order."""
+    return [
+        [getattr(tool, "name", type(tool).__name__), getattr(tool, "description", None),
+         getattr(tool, "params_json_schema", None)]
+        for tool in canonical_tools(getattr(agent, "tools", None) or [])
+    ]
+
+
+def cache_key(agent, items, data_version=None) -> str:
+    """
+    Hash of everything that decides the answer: agent name, instructions, model, tool schemas,
+    the version of the data the tools read (data_version) and the input.
+    """
+    instructions = agent.instructions
+    if not isinstance(instructions, str):
+        # Dynamic instructions: key on the function that produces them.
+        instructions = getattr(instructions, "__qualname__", repr(instructions))
+    model_name = getattr(agent.model, "model", agent.model)
+    payload = json.dumps(
+        [agent.name, instructions, str(model_name), tool_schemas(agent), data_version, normalize_history(items)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def agent_namespace(agent, data_version=None) -> str:
+    """Key of the agent alone, so semantic matches never cross agents, instruction or data versions."""
+    return cache_key(agent, [], data_version)
+
+
+class MemoryCache:
+    """In-memory LRU cache; entries expire after ttl seconds."""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._data[key] = (value, time.time() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    On-disk cache that survives restarts and can be shared by workers on the same host.
+    Every statement runs in one thread, never on the event loop: set() returns at once,
+    get_async() awaits the read, and get() blocks (for scripts).
+    """
+
+    def __init__(self, path: str = "response_cache.sqlite3", ttl: float = 86400):
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+
+    def _submit(self, fn, *args):
+        future = self._worker.submit(fn, *args)
+        future.add_done_callback(_log_error)
+        return future
+
+    def get(self, key: str):
+        return self._submit(self._get, key).result()
+
+    async def get_async(self, key: str):
+        return await asyncio.wrap_future(self._submit(self._get, key))
+
+    def _get(self, key: str):
+        row = self._db.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        self._submit(self._set, key, value, time.time() + self.ttl)
+
+    def _set(self, key: str, value: str, expires: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)", (key, value, expires)
+        )
+        self._db.commit()
+
+    def purge_expired(self):
+        self._submit(self._purge_expired)
+
+    def _purge_expired(self):
+        self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+        self._db.commit()
+
+    def __len__(self):
+        return self._submit(self._count).result()
+
+    def _count(self):
+        return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def _log_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Response cache query failed", exc_info=future.exception())
+
+
+class ResponseCache:
+    """
+    Looks up an answer before calling the model and stores it afterwards.
+    - run(): cached version of Runner.run, returns the final text
+    - stream(): cached version of Runner.run_streamed, yields text deltas;
+      a hit is replayed in chunks, so the UI streams it the same way
+    An optional SemanticCache is asked when the exact lookup misses.
+    data_version() returns the version of the data an agent's tools read (e.g. the catalog's
+    fingerprint); it is part of the key of every agent that has tools, so a data change is
+    never answered from before it.
+    """
+
+    def __init__(self, backend=None, semantic: SemanticCache | None = None, data_version=None):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.semantic = semantic
+        self.data_version = data_version
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, data_version=None) -> "ResponseCache | None":
+        """RESPONSE_CACHE=memory|sqlite|off, RESPONSE_CACHE_TTL, RESPONSE_CACHE_PATH."""
+        kind = os.getenv("RESPONSE_CACHE", "memory").lower()
+        ttl = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        if kind == "sqlite":
+            backend = SQLiteCache(os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3"), ttl=ttl)
+        elif kind == "memory":
+            backend = MemoryCache(ttl=ttl)
+        else:
+            return None
+        return cls(backend, semantic=SemanticCache.from_env(), data_version=data_version)
+
+    def _version(self, agent):
+        if self.data_version is None or not getattr(agent, "tools", None):
+            return None
+        return self.data_version()
+
+    def key(self, agent, input) -> str:
+        return cache_key(agent, input, self._version(agent))
+
+    async def lookup(self, key: str, agent=None, input=None):
+        # A backend with get_async (SQLiteCache) reads off the event loop.
+        get_async = getattr(self.backend, "get_async", None)
+        value = await get_async(key) if get_async is not None else self.backend.get(key)
+        if value is None and self.semantic is not None and agent is not None:
+            question = standalone_question(input)
+            if question:
+                value = self.semantic.lookup(agent_namespace(agent, self._version(agent)), question)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def store(self, key: str, answer: str, agent=None, input=None):
+        self.backend.set(key, answer)
+        if self.semantic is not None and agent is not None:
+            question = standalone_question(input)
+            if question:
+                self.semantic.add(agent_namespace(agent, self._version(agent)), question, answer)
+
+    async def run(self, agent, input) -> str:
+        key = self.key(agent, input)
+        cached = await self.lookup(key, agent, input)
+        if cached is not None:
+            return cached
+        from agents import Runner
+
+        result = await Runner.run(starting_agent=agent, input=input)
+        answer = str(result.final_output)
+        self.store(key, answer, agent, input)
+        return answer
+
+    async def stream(self, agent, input, on_usage=None, before_store=None):
+        """
+        before_store: awaited once the answer is complete and before it is cached, e.g. the
+        input guardrails' verdict; if it raises, the answer is not stored.
+        """
+        key = self.key(agent, input)
+        cached = await self.lookup(key, agent, input)
+        if cached is not None:
+            for start in range(0, len(cached), REPLAY_CHUNK_CHARS):
+                yield cached[start:start + REPLAY_CHUNK_CHARS]
+            return
+        from agents import Runner
+
+        parts = []
+        response = Runner.run_streamed(starting_agent=agent, input=input)
+        async with aclosing(text_deltas(response, on_usage)) as deltas:
+            async for delta in deltas:
+                if isinstance(delta, str):
+                    parts.append(delta)
+                yield delta
+        # Only complete answers are stored; an error or cancellation above skips this.
+        if parts:
+            if before_store is not None:
+                await before_store()
+            self.store(key, "".join(parts), agent, input)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.backend),
+            "semantic": self.semantic.stats() if self.semantic is not None else None,
+        }
@@ -0,0 +1,138 @@
+# This code is part of the Agent with UI project.
+# Runs several agents on the same input at the same time and merges their answers.
+#
+#   async for answer in fan_out(agents, "My invoice is wrong"):   # in the order they finish
+#       print(answer.agent, answer.output)
+#
+#   text = await fan_in(agents, "My invoice is wrong", strategy=judge(judge_agent))
+#
+# Usage (the specialists registered in main.py):
+#   python fanout.py "I was charged twice and now I can't sign in" --strategy judge
+
+from contextlib import aclosing
+from dataclasses import dataclass
+import argparse
+import asyncio
+import time
+
+
+@dataclass
+class AgentAnswer:
+    agent: str
+    output: str | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def run_agent(agent, input, timeout: float | None = None) -> AgentAnswer:
+    """One agent run; a failure or timeout is reported in the answer instead of raised."""
+    from agents import Runner
+
+    t0 = time.monotonic()
+    try:
+        result = await asyncio.wait_for(Runner.run(starting_agent=agent, input=input), timeout)
+        return AgentAnswer(agent.name, output=str(result.final_output), seconds=time.monotonic() - t0)
+    except asyncio.TimeoutError:
+        return AgentAnswer(agent.name, error=f"timed out after {timeout:g}s", seconds=time.monotonic() - t0)
+    except Exception as error:
+        return AgentAnswer(agent.name, error=f"{type(error).__name__}: {error}", seconds=time.monotonic() - t0)
+
+
+async def fan_out(agents: list, input, timeout=30.0):
+    """
+    Runs every agent concurrently and yields an AgentAnswer as each one finishes.
+    timeout is in seconds, either one value for all agents or a dict keyed by agent name.
+    Closing the generator early (e.g. after the first good answer) cancels the runs still going.
+    """
+    def limit(agent):
+        return timeout.get(agent.name) if isinstance(timeout, dict) else timeout
+
+    tasks = [asyncio.create_task(run_agent(agent, input, limit(agent))) for agent in agents]
+    try:
+        for next_answer in asyncio.as_completed(tasks):
+            yield await next_answer
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Merge strategies: async functions (answers, input) -> result, where answers is the
+# fan_out() generator. They can stop reading early; fan_in() then cancels the rest.
+
+async def first_wins(answers, input) -> AgentAnswer | None:
+    """The first answer that succeeded; the slower agents are cancelled."""
+    async for answer in answers:
+        if answer.ok:
+            return answer
+    return None
+
+
+async def all_answers(answers, input) -> list:
+    """Every answer (failed ones included), in the order they finished."""
+    return [answer async for answer in answers]
+
+
+def judge(judge_agent):
+    """A strategy that asks judge_agent to merge the successful answers into one reply."""
+    async def merge(answers, input) -> str:
+        from agents import Runner
+
+        good = [answer async for answer in answers if answer.ok]
+        if not good:
+            raise RuntimeError("No agent produced an answer")
+        if len(good) == 1:
+            return good[0].output
+        drafts = "\n\n".join(f"[{answer.agent}]\n{answer.output}" for answer in good)
+        prompt = f"Customer question:\n{question_text(input)}\n\nSpecialist answers:\n{drafts}"
+        result = await Runner.run(starting_agent=judge_agent, input=prompt)
+        return str(result.final_output)
+
+    return merge
+
+
+def question_text(input) -> str:
+    """The latest user message of a prompt (a string or a list of SDK input items)."""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if item.get("role") == "user":
+            return str(item.get("content", ""))
+    return ""
+
+
+async def fan_in(agents: list, input, strategy=all_answers, timeout=30.0):
+    """Runs the agents with fan_out() and merges their answers with `strategy`."""
+    async with aclosing(fan_out(agents, input, timeout)) as answers:
+        return await strategy(answers, input)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ask the support specialists in parallel.")
+    parser.add_argument("question")
+    parser.add_argument("--strategy", choices=("first", "all", "judge"), default="all")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per agent")
+    args = parser.parse_args()
+
+    from main import registry, SPECIALIST_INSTRUCTIONS, JUDGE_AGENT_NAME
+
+    async def go():
+        agents = [await registry.get(name) for name in SPECIALIST_INSTRUCTIONS]
+        if args.strategy == "judge":
+            print(await fan_in(agents, args.question, judge(await registry.get(JUDGE_AGENT_NAME)), args.timeout))
+        elif args.strategy == "first":
+            answer = await fan_in(agents, args.question, first_wins, args.timeout)
+            print(f"[{answer.agent}] {answer.output}" if answer else "No agent produced an answer")
+        else:
+            # Print each answer as soon as its agent is done.
+            async for answer in fan_out(agents, args.question, args.timeout):
+                print(f"[{answer.agent} {answer.seconds:.1f}s] {answer.output if answer.ok else answer.error}\n")
+
+    asyncio.run(go())
+
+
+if __name__ == "__main__":
+    main()
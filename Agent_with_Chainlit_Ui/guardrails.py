@@ -0,0 +1,317 @@
+# This code is part of the Agent with UI project.
+# Input guardrails that do not add a round trip to every turn:
+# - local checks (length, blocked patterns, PII) are plain functions and run inline, in microseconds
+# - model checks (an agent that classifies the message) start at the same time as the answer
+# - the answer's tokens are held back until the model checks pass, or the answer is stopped
+#   as soon as one of them fails; nothing unchecked reaches the user
+# Every check is timed on the turn span (phase "guardrail_<name>"), plus "guardrail_hold":
+# how long the first tokens waited for the checks, i.e. what guardrails added to TTFT.
+#
+# Environment:
+#   GUARDRAIL_MAX_CHARS       longest accepted message (default 4000)
+#   GUARDRAIL_MODEL_CHECK     1 (default) runs the model check, 0 turns it off
+#   GUARDRAIL_TIMEOUT         seconds a model check may take before it is skipped (default 5)
+#   GUARDRAIL_HOLD_BACK       1 (default) holds tokens until the checks pass; 0 streams them
+#                             right away and stops the answer on a violation
+
+from collections.abc import Callable
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import dataclass
+import asyncio
+import inspect
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# End of the guarded deltas, returned by anext() instead of raising StopAsyncIteration.
+_END = object()
+
+BLOCKED_MESSAGE = "Sorry, I can't help with that request."
+PII_MESSAGE = ("For your security, please don't share card numbers or other identity numbers in the chat. "
+               "Remove them and send your question again.")
+
+
+class GuardrailViolation(Exception):
+    """Raised when a guardrail rejects a message; str(error) is the message to show the user."""
+
+    def __init__(self, guardrail: str, reason: str, message: str = BLOCKED_MESSAGE):
+        super().__init__(message)
+        self.guardrail = guardrail
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class Guardrail:
+    """
+    check(text) returns None when the text is fine, or the reason it is not.
+    A plain function runs inline; an async one runs next to the answer.
+    """
+    name: str
+    check: Callable
+    message: str = BLOCKED_MESSAGE
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.check)
+
+
+# ---------- local checks ----------
+
+def max_length(limit: int):
+    def check(text: str):
+        return f"message is {len(text)} characters, the limit is {limit}" if len(text) > limit else None
+
+    return check
+
+
+def blocked_patterns(patterns):
+    """Rejects text matching any of the regular expressions (case-insensitive)."""
+    combined = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+    def check(text: str):
+        match = combined.search(text)
+        return f"blocked phrase {match.group(0)!r}" if match else None
+
+    return check
+
+
+# Common prompt-injection phrasings.
+INJECTION_PATTERNS = (
+    r"ignore (all |any )?(the )?(previous|prior|above) (instructions|prompts?)",
+    r"disregard (your|the) (instructions|system prompt)",
+    r"(reveal|show|print) (me )?(your|the) (system prompt|instructions)",
+)
+
+_CARD = re.compile(r"\b(?:\d[ -]?){13,19}\b")
+_SSN = re.compile(r"\b\d{3}-\d{2}-\d{4}\b")
+
+
+def _luhn_ok(digits: str) -> bool:
+    total = 0
+    for i, char in enumerate(reversed(digits)):
+        n = int(char)
+        if i % 2:
+            n = n * 2 - 9 if n > 4 else n * 2
+        total += n
+    return total % 10 == 0
+
+
+def pii(text: str):
+    """Card numbers (checked with the Luhn checksum, so order numbers pass) and US social security numbers."""
+    for match in _CARD.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        if 13 <= len(digits) <= 19 and _luhn_ok(digits):
+            return "card number"
+    if _SSN.search(text):
+        return "social security number"
+    return None
+
+
+# ---------- model checks ----------
+
+def model_check(get_agent, timeout: float = 5.0):
+    """
+    An async check that asks a classifier agent about the message. The agent answers
+    SAFE or "UNSAFE: <reason>". A check that fails or is too slow lets the message through
+    (the local checks still apply): a guardrail outage must not take the assistant down.
+    """
+    async def check(text: str):
+        from agents import Runner
+
+        try:
+            result = await asyncio.wait_for(Runner.run(starting_agent=await get_agent(), input=text), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Guardrail model check timed out after %.1f s, message allowed", timeout)
+            return None
+        except Exception:
+            logger.exception("Guardrail model check failed, message allowed")
+            return None
+        verdict = str(result.final_output).strip()
+        if verdict.upper().startswith("UNSAFE"):
+            return verdict.partition(":")[2].strip() or "flagged by the model check"
+        return None
+
+    return check
+
+
+class GuardedTurn:
+    """The model checks of one message, started by Guardrails.start()."""
+
+    def __init__(self, tasks: dict, span):
+        # name -> task returning (guardrail, reason or None)
+        self.tasks = tasks
+        self.span = span
+
+    def done(self) -> bool:
+        return all(task.done() for task in self.tasks.values())
+
+    def raise_if_failed(self):
+        """Raises GuardrailViolation for the first finished check that rejected the message."""
+        for task in self.tasks.values():
+            if task.done():
+                guardrail, reason = task.result()
+                if reason is not None:
+                    raise GuardrailViolation(guardrail.name, reason, guardrail.message)
+
+    async def wait(self):
+        if self.tasks:
+            await asyncio.wait(self.tasks.values())
+        self.raise_if_failed()
+
+    @asynccontextmanager
+    async def watch(self):
+        """
+        Yields a reader whose next() a failed check interrupts at once, the way asyncio.timeout()
+        does: the current task is cancelled and the cancellation comes out of the block as the
+        GuardrailViolation. The reads stay in this task, so the SDK's stream is still read by
+        the task that started it. A stop from elsewhere stays a CancelledError.
+        """
+        reader = _Reader(self)
+        task = reader.task
+
+        def on_done(check):
+            if (reader.reading and not reader.interrupted
+                    and not check.cancelled() and check.result()[1] is not None):
+                reader.interrupted = True
+                task.cancel()
+
+        # One set of callbacks for the whole stream, not one per delta.
+        for check in self.tasks.values():
+            check.add_done_callback(on_done)
+        try:
+            yield reader
+        except asyncio.CancelledError:
+            if reader.interrupted and task.uncancel() == 0:
+                self.raise_if_failed()
+            raise
+        finally:
+            reader.reading = False
+            for check in self.tasks.values():
+                check.remove_done_callback(on_done)
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+
+class _Reader:
+    """Reads the guarded deltas for GuardedTurn.watch(); only a read in progress is interrupted."""
+
+    __slots__ = ("turn", "task", "reading", "interrupted")
+
+    def __init__(self, turn: GuardedTurn):
+        self.turn = turn
+        self.task = asyncio.current_task()
+        self.reading = False
+        self.interrupted = False
+
+    async def next(self, iterator):
+        # A check that failed while the caller had control (e.g. a streamed delta) counts now.
+        self.turn.raise_if_failed()
+        self.reading = True
+        try:
+            return await anext(iterator, _END)
+        finally:
+            self.reading = False
+
+
+class Guardrails:
+    """
+    Use one instance per process:
+
+        turn = guardrails.start(message, span)   # local checks now, model checks in the background
+        async for text in guardrails.guard(deltas, turn):
+            ...
+
+    start() raises GuardrailViolation when a local check fails, before any model call;
+    guard() raises it while streaming when a model check fails (the answer is stopped).
+    """
+
+    def __init__(self, guardrails, hold_back: bool = True):
+        self.guardrails = list(guardrails)
+        self.hold_back = hold_back
+        self.violations = {}
+
+    @classmethod
+    def from_env(cls, get_agent=None) -> "Guardrails":
+        """The default set; get_agent returns the classifier agent for the model check."""
+        guardrails = [
+            Guardrail("length", max_length(int(os.getenv("GUARDRAIL_MAX_CHARS", "4000")))),
+            Guardrail("injection", blocked_patterns(INJECTION_PATTERNS)),
+            Guardrail("pii", pii, PII_MESSAGE),
+        ]
+        if get_agent is not None and os.getenv("GUARDRAIL_MODEL_CHECK", "1") != "0":
+            timeout = float(os.getenv("GUARDRAIL_TIMEOUT", "5"))
+            guardrails.append(Guardrail("model", model_check(get_agent, timeout)))
+        return cls(guardrails, hold_back=os.getenv("GUARDRAIL_HOLD_BACK", "1") != "0")
+
+    def _violation(self, guardrail: Guardrail, reason: str):
+        self.violations[guardrail.name] = self.violations.get(guardrail.name, 0) + 1
+        logger.info("Guardrail %s rejected a message: %s", guardrail.name, reason)
+        return GuardrailViolation(guardrail.name, reason, guardrail.message)
+
+    def start(self, text: str, span) -> GuardedTurn:
+        for guardrail in self.guardrails:
+            if not guardrail.is_async:
+                with span.phase(f"guardrail_{guardrail.name}"):
+                    reason = guardrail.check(text)
+                if reason is not None:
+                    raise self._violation(guardrail, reason)
+
+        async def run(guardrail):
+            with span.phase(f"guardrail_{guardrail.name}"):
+                reason = await guardrail.check(text)
+            if reason is not None:
+                self._violation(guardrail, reason)
+            return guardrail, reason
+
+        tasks = {g.name: asyncio.create_task(run(g)) for g in self.guardrails if g.is_async}
+        return GuardedTurn(tasks, span)
+
+    async def guard(self, deltas, turn: GuardedTurn):
+        """
+        Passes the deltas through once the model checks pass. Held-back deltas are
+        released together. A failed check closes the deltas (which stops the run) as soon
+        as it is known, also while the upstream is quiet, e.g. during a tool call.
+        """
+        held = []
+        first_held = None
+        item = None
+        try:
+            async with aclosing(deltas):
+                iterator = aiter(deltas)
+                async with turn.watch() as reader:
+                    while not turn.done():
+                        item = await reader.next(iterator)
+                        if item is _END:
+                            # The answer was shorter than the checks: wait for them before showing it.
+                            await turn.wait()
+                            break
+                        if self.hold_back:
+                            if first_held is None:
+                                first_held = time.perf_counter()
+                            held.append(item)
+                        else:
+                            yield item
+                turn.raise_if_failed()
+                if held:
+                    self._record_hold(turn, first_held)
+                    for earlier in held:
+                        yield earlier
+                if item is not _END:
+                    # The checks passed: the rest of the answer goes straight through.
+                    async for item in iterator:
+                        yield item
+        finally:
+            turn.cancel()
+
+    @staticmethod
+    def _record_hold(turn: GuardedTurn, first_held):
+        if first_held is not None:
+            turn.span.record("guardrail_hold", time.perf_counter() - first_held)
+
+    def stats(self) -> dict:
+        return {"violations": dict(self.violations)}
@@ -0,0 +1,191 @@
+# This code is part of the Agent with UI project.
+# Keeps each chat session's history inside a token budget.
+
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Every message costs a few tokens on top of its text (role, separators).
+MESSAGE_OVERHEAD = 4
+
+# Loaded on first use: tiktoken may download its vocabulary the first time it runs.
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # tiktoken is optional; fall back to a cheap estimate
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text)) + MESSAGE_OVERHEAD
+    # Roughly 4 characters per token for English text.
+    return len(text) // 4 + 1 + MESSAGE_OVERHEAD
+
+
+@dataclass(slots=True)
+class Turn:
+    """
+    One chat turn. Slots and interned role strings keep long histories small;
+    the SDK's dict form is only built when a prompt is sent (see to_input).
+    """
+    role: str
+    content: str
+    tokens: int = 0
+    # Row id in the session store, if any.
+    id: int | None = None
+
+    def __post_init__(self):
+        self.role = sys.intern(self.role)
+
+    def to_input(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+
+async def local_summary(previous: str, turns: list, max_chars: int = 1200) -> str:
+    """
+    Summarizer that needs no model call: keeps the first line of every folded turn.
+    Used when no summarizer is configured and as a fallback when the model call fails.
+    """
+    lines = [previous] if previous else []
+    for turn in turns:
+        first_line = turn["content"].strip().split("\n", 1)[0][:200]
+        lines.append(f"{turn['role']}: {first_line}")
+    text = "\n".join(lines)
+    # Keep the newest part when the summary itself grows too long.
+    return text[-max_chars:]
+
+
+def agent_summarizer(get_agent):
+    """
+    Builds a summarizer that asks an agent to merge older turns into the running summary.
+    get_agent is an awaitable accessor, e.g. lambda: registry.get("History Summarizer").
+    """
+    async def summarize(previous: str, turns: list) -> str:
+        from agents import Runner
+
+        transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        prompt = (
+            f"Current summary:\n{previous or '(empty)'}\n\n"
+            f"New conversation turns:\n{transcript}\n\n"
+            "Return the updated summary."
+        )
+        result = await Runner.run(starting_agent=await get_agent(), input=prompt)
+        return str(result.final_output).strip()
+
+    return summarize
+
+
+class HistoryManager:
+    """
+    Token-budgeted history for one chat session.
+    - The most recent turns are kept word for word.
+    - When the budget is exceeded, the oldest turns are folded into a rolling summary.
+      Folding runs as a background task, so it never delays the reply to the user.
+    - A fold goes down to fold_to x budget, not just under the budget: the summary (part of
+      the prompt prefix the provider caches) then stays the same for several turns.
+    - Token counts are computed once per turn, when the turn is added.
+    - With a session store, every turn and summary is also written there (see load()).
+    """
+
+    def __init__(self, token_budget: int = 3000, min_recent: int = 4, summarizer=None,
+                 store=None, session_id: str | None = None, fold_to: float = 0.75):
+        self.token_budget = token_budget
+        self.min_recent = min_recent
+        self.fold_to = fold_to
+        self.summarizer = summarizer or local_summary
+        self.store = store
+        self.session_id = session_id
+        self.summary = ""
+        self._summary_tokens = 0
+        # Turn records, oldest first
+        self._recent = deque()
+        self._recent_tokens = 0
+        # Turns taken out of the recent window but not yet folded into the summary
+        self._pending = []
+        self._task = None
+
+    @property
+    def tokens(self) -> int:
+        """Tokens the next prompt will use for history."""
+        return self._summary_tokens + self._recent_tokens + sum(turn.tokens for turn in self._pending)
+
+    @classmethod
+    def load(cls, store, session_id: str, **kwargs) -> "HistoryManager":
+        """History of a stored session; only the summary and the recent window are read."""
+        history = cls(store=store, session_id=session_id, **kwargs)
+        summary, summary_tokens, turns = store.load(session_id, history.token_budget, history.min_recent)
+        history.summary = summary
+        history._summary_tokens = summary_tokens
+        for turn in turns:
+            history._recent.append(turn)
+            history._recent_tokens += turn.tokens
+        return history
+
+    def append(self, role: str, content: str):
+        turn = Turn(role, content, count_tokens(content))
+        if self.store is not None:
+            # Sets turn.id; the SQLite store writes in its own thread, so this does not wait for disk.
+            self.store.append(self.session_id, turn)
+        self._recent.append(turn)
+        self._recent_tokens += turn.tokens
+        self._trim()
+
+    def _trim(self):
+        if self._summary_tokens + self._recent_tokens <= self.token_budget:
+            target = self.token_budget
+        else:
+            target = self.token_budget * self.fold_to
+        while (len(self._recent) > self.min_recent
+               and self._summary_tokens + self._recent_tokens > target):
+            turn = self._recent.popleft()
+            self._recent_tokens -= turn.tokens
+            self._pending.append(turn)
+        if self._pending and (self._task is None or self._task.done()):
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._fold())
+            except RuntimeError:
+                # No event loop (e.g. plain scripts): the pending turns stay verbatim for now.
+                pass
+
+    async def _fold(self):
+        while self._pending:
+            batch = self._pending[:]
+            turns = [turn.to_input() for turn in batch]
+            try:
+                summary = await self.summarizer(self.summary, turns)
+            except Exception:
+                logger.exception("History summarizer failed, using the local summary")
+                summary = await local_summary(self.summary, turns)
+            self.summary = summary
+            self._summary_tokens = count_tokens(summary)
+            if self.store is not None:
+                self.store.save_summary(self.session_id, summary, self._summary_tokens, batch[-1])
+            # Only drop what was summarized; more turns may have arrived meanwhile.
+            del self._pending[:len(batch)]
+
+    def as_input(self) -> list:
+        """The history in the SDK input format, ready for Runner.run / run_streamed."""
+        items = []
+        if self.summary:
+            items.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        items.extend(turn.to_input() for turn in self._pending)
+        items.extend(turn.to_input() for turn in self._recent)
+        return items
+
+    def __len__(self):
+        return len(self._pending) + len(self._recent)
@@ -0,0 +1,233 @@
+# This code is part of the Agent with UI project.
+# Lightweight per-turn timing, independent of the hosted OpenAI tracing
+# (which stays off via set_tracing_disabled). Exports Prometheus text and/or JSON lines.
+#
+# Environment:
+#   AGENT_METRICS_SAMPLE_RATE   share of turns recorded (default 1.0; 0 turns it off)
+#   AGENT_METRICS_JSONL         append one JSON line per recorded turn to this file
+#   AGENT_METRICS_PROM          rewrite this file with Prometheus text every few seconds
+
+from contextlib import aclosing, contextmanager
+import atexit
+import json
+import os
+import random
+import threading
+import time
+
+# Histogram buckets in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    """Timings of one chat turn. Phases are durations, marks are offsets from the turn start."""
+
+    __slots__ = ("start", "phases", "marks", "attrs")
+
+    def __init__(self, **attrs):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.marks = {}
+        self.attrs = attrs
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = time.perf_counter() - t0
+
+    def mark(self, name: str):
+        """Records the first time `name` happens; later calls are ignored."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    def record(self, name: str, seconds: float):
+        """Adds a phase that was timed elsewhere (e.g. across several steps)."""
+        self.phases[name] = seconds
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {"phases": self.phases, "marks": self.marks, **self.attrs}
+
+
+class _NoopSpan:
+    """Returned for turns that are not sampled, so the hot path pays almost nothing."""
+
+    __slots__ = ()
+
+    @contextmanager
+    def phase(self, name: str):
+        yield self
+
+    def mark(self, name: str):
+        pass
+
+    def record(self, name: str, seconds: float):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+
+class TurnMetrics:
+    """
+    Collects spans of sampled turns.
+    - start_turn() returns a Span (or the shared no-op span when the turn is not sampled)
+    - finish() adds the span to the histograms and to the JSON lines file
+    """
+
+    def __init__(self, sample_rate: float = 1.0, jsonl_path: str | None = None,
+                 prom_path: str | None = None, export_interval: float = 10.0):
+        self.sample_rate = sample_rate
+        self.prom_path = prom_path
+        self.export_interval = export_interval
+        self._histograms = {}
+        self._tokens = {"in": 0, "out": 0}
+        # Input tokens as reported by the provider, split by whether its prompt cache served them
+        self._prompt_tokens = {"cached": 0, "uncached": 0}
+        self._turns = 0
+        self._errors = 0
+        self._last_export = time.monotonic()
+        # Functions returning more Prometheus lines (e.g. the provider's connection pool gauges)
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> "TurnMetrics":
+        return cls(
+            sample_rate=float(os.getenv("AGENT_METRICS_SAMPLE_RATE", "1.0")),
+            jsonl_path=os.getenv("AGENT_METRICS_JSONL") or None,
+            prom_path=os.getenv("AGENT_METRICS_PROM") or None,
+        )
+
+    def start_turn(self, **attrs):
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return NOOP_SPAN
+        return Span(**attrs)
+
+    def add_collector(self, collect):
+        """collect() returns Prometheus text lines, added to every export."""
+        if collect not in self._collectors:
+            self._collectors.append(collect)
+
+    def finish(self, span):
+        if span is NOOP_SPAN:
+            return
+        span.mark("end")
+        timings = dict(span.phases)
+        marks = span.marks
+        if "admitted" in marks:
+            timings["queue"] = marks["admitted"]
+        if "ttft" in marks:
+            timings["ttft"] = marks["ttft"]
+            timings["stream"] = marks["end"] - marks["ttft"]
+        if "request" in marks and "first_delta" in marks:
+            timings["request_send"] = marks["first_delta"] - marks["request"]
+        timings["total"] = marks["end"]
+        with self._lock:
+            self._turns += 1
+            self._errors += 1 if span.attrs.get("error") else 0
+            for name, seconds in timings.items():
+                self._histograms.setdefault(name, _Histogram()).observe(seconds)
+            self._tokens["in"] += span.attrs.get("tokens_in", 0)
+            self._tokens["out"] += span.attrs.get("tokens_out", 0)
+            cached = span.attrs.get("prompt_tokens_cached", 0)
+            self._prompt_tokens["cached"] += cached
+            self._prompt_tokens["uncached"] += span.attrs.get("prompt_tokens", 0) - cached
+            if self._jsonl is not None:
+                record = {"ts": time.time(), "timings": timings, **span.attrs}
+                self._jsonl.write(json.dumps(record) + "\n")
+        if self.prom_path and time.monotonic() - self._last_export >= self.export_interval:
+            self.export_prometheus()
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP agent_turn_phase_seconds Duration of each phase of a chat turn.",
+            "# TYPE agent_turn_phase_seconds histogram",
+        ]
+        with self._lock:
+            for name, hist in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    lines.append(f'agent_turn_phase_seconds_bucket{{phase="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'agent_turn_phase_seconds_bucket{{phase="{name}",le="+Inf"}} {hist.count}')
+                lines.append(f'agent_turn_phase_seconds_sum{{phase="{name}"}} {hist.total}')
+                lines.append(f'agent_turn_phase_seconds_count{{phase="{name}"}} {hist.count}')
+            lines += [
+                "# HELP agent_tokens_total Tokens sent to and received from the model (sampled turns).",
+                "# TYPE agent_tokens_total counter",
+                f'agent_tokens_total{{direction="in"}} {self._tokens["in"]}',
+                f'agent_tokens_total{{direction="out"}} {self._tokens["out"]}',
+                "# HELP agent_prompt_tokens_total Input tokens reported by the provider, by prompt cache use.",
+                "# TYPE agent_prompt_tokens_total counter",
+                f'agent_prompt_tokens_total{{cache="hit"}} {self._prompt_tokens["cached"]}',
+                f'agent_prompt_tokens_total{{cache="miss"}} {self._prompt_tokens["uncached"]}',
+                "# HELP agent_turns_sampled_total Chat turns recorded.",
+                "# TYPE agent_turns_sampled_total counter",
+                f"agent_turns_sampled_total {self._turns}",
+                "# HELP agent_turn_errors_total Recorded chat turns that failed.",
+                "# TYPE agent_turn_errors_total counter",
+                f"agent_turn_errors_total {self._errors}",
+                "# HELP agent_metrics_sample_rate Share of chat turns recorded.",
+                "# TYPE agent_metrics_sample_rate gauge",
+                f"agent_metrics_sample_rate {self.sample_rate}",
+            ]
+        for collect in self._collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self):
+        self._last_export = time.monotonic()
+        if not self.prom_path:
+            return
+        # Write then rename, so a scraper never reads a half-written file.
+        tmp = self.prom_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, self.prom_path)
+
+    def close(self):
+        if self.prom_path:
+            self.export_prometheus()
+        if self._jsonl is not None and not self._jsonl.closed:
+            self._jsonl.close()
+
+
+async def timed(deltas, span):
+    """Passes the deltas through, marking when the first one arrives from upstream."""
+    async with aclosing(deltas):
+        async for delta in deltas:
+            span.mark("first_delta")
+            yield delta
+
+
+metrics = TurnMetrics.from_env()
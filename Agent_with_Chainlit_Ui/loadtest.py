@@ -0,0 +1,188 @@
+# This code is part of the Agent with UI project.
+# Load test: N simulated chat sessions go through the real on_chat_start / on_message handlers
+# of ui.py, backed by the local mock model server instead of Gemini.
+#
+# Usage:
+#   python loadtest.py --sessions 200 --turns 3 --ttft 0.3 --tps 60 --tokens 120
+#   python loadtest.py --base-url http://127.0.0.1:8787/v1/   # use an already running stub
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from mock_server import MockConfig, MockServer
+
+QUESTIONS = (
+    "How do I reset my password?",
+    "My invoice shows a double charge, what should I do?",
+    "Can I change the email address on my account?",
+    "The app crashes when I upload a photo.",
+    "How long does a refund take?",
+)
+
+_session_data = ContextVar("session_data")
+_turn = ContextVar("turn", default=None)
+
+
+@dataclass
+class TurnTiming:
+    start: float
+    first_token: float | None = None
+    end: float | None = None
+    frames: int = 0
+    error: str | None = None
+
+
+class FakeMessage:
+    """Stands in for cl.Message and records when the first token reaches the 'browser'."""
+
+    def __init__(self, content: str = "", **kwargs):
+        self.content = content
+
+    async def send(self):
+        return self
+
+    async def update(self):
+        return self
+
+    async def stream_token(self, token: str, is_sequence: bool = False):
+        turn = _turn.get()
+        if turn is not None:
+            if turn.first_token is None:
+                turn.first_token = time.perf_counter()
+            turn.frames += 1
+        self.content = token if is_sequence else self.content + token
+
+
+class FakeUserSession:
+    """Stands in for cl.user_session: one dict per simulated session (held in a context variable)."""
+
+    def get(self, key, default=None):
+        return _session_data.get().get(key, default)
+
+    def set(self, key, value):
+        _session_data.get()[key] = value
+
+
+class FakeContext:
+    """Stands in for cl.context: the simulated session's ids."""
+
+    @property
+    def session(self):
+        session_id = _session_data.get()["id"]
+        return SimpleNamespace(id=session_id, thread_id=session_id)
+
+
+def fake_chainlit():
+    return SimpleNamespace(Message=FakeMessage, user_session=FakeUserSession(), context=FakeContext())
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+@dataclass
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that asked to sleep `interval` seconds."""
+    interval: float = 0.01
+    samples: list = field(default_factory=list)
+
+    async def run(self):
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - t0 - self.interval)
+
+
+async def run_load(sessions: int, turns: int, think_time: float, mock: MockConfig,
+                   base_url: str | None = None, keep_cache: bool = False) -> dict:
+    server = None
+    if base_url is None:
+        server = await MockServer(mock).start()
+        base_url = server.base_url
+    # The provider reads these when ui.py / main.py are first imported.
+    os.environ["GEMINI_BASE_URL"] = base_url
+    os.environ.setdefault("GEMINI_API_KEY", "mock")
+    if not keep_cache:
+        os.environ["RESPONSE_CACHE"] = "off"
+
+    import ui
+    ui.cl = fake_chainlit()
+
+    timings = []
+    monitor = LoopLagMonitor()
+    monitor_task = asyncio.create_task(monitor.run())
+
+    async def session(number: int):
+        _session_data.set({"id": f"load-{number}"})
+        await ui.on_chat_start()
+        for _ in range(turns):
+            timing = TurnTiming(start=time.perf_counter())
+            _turn.set(timing)
+            try:
+                await ui.main(FakeMessage(random.choice(QUESTIONS)))
+            except Exception as error:
+                timing.error = f"{type(error).__name__}: {error}"
+            timing.end = time.perf_counter()
+            timings.append(timing)
+            await asyncio.sleep(think_time)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    monitor_task.cancel()
+    if server is not None:
+        await server.stop()
+
+    ok = [t for t in timings if t.error is None]
+    ttft = [t.first_token - t.start for t in ok if t.first_token is not None]
+    total = [t.end - t.start for t in ok]
+    return {
+        "sessions": sessions,
+        "turns": len(timings),
+        "errors": len(timings) - len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_turns_per_s": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "ttft_ms": {f"p{p}": ms(percentile(ttft, p)) for p in (50, 95, 99)},
+        "latency_ms": {f"p{p}": ms(percentile(total, p)) for p in (50, 95, 99)},
+        "frames_per_turn": round(sum(t.frames for t in ok) / len(ok), 1) if ok else 0.0,
+        "loop_lag_ms": {"p50": ms(percentile(monitor.samples, 50)), "p99": ms(percentile(monitor.samples, 99)),
+                        "max": ms(max(monitor.samples, default=0.0))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Chainlit agent against a mock model.")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=0.5, help="seconds between turns of a session")
+    parser.add_argument("--ttft", type=float, default=MockConfig.ttft)
+    parser.add_argument("--tps", type=float, default=MockConfig.tokens_per_sec)
+    parser.add_argument("--tokens", type=int, default=MockConfig.output_tokens)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--base-url", default=None, help="use a running mock server instead of starting one")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    args = parser.parse_args()
+
+    mock = MockConfig(ttft=args.ttft, tokens_per_sec=args.tps, output_tokens=args.tokens,
+                      error_rate=args.error_rate)
+    report = asyncio.run(run_load(args.sessions, args.turns, args.think_time, mock, args.base_url, args.cache))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# This code is part of the Agent with UI project.
+# A local OpenAI-compatible chat completions server that streams synthetic tokens.
+# Point the app at it to benchmark without calling Gemini:
+#
+#   python mock_server.py --port 8787 --ttft 0.3 --tps 60 --tokens 120 --error-rate 0.01
+#   GEMINI_BASE_URL=http://127.0.0.1:8787/v1/ GEMINI_API_KEY=mock chainlit run ui.py
+
+from dataclasses import dataclass
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+WORDS = ("sure", "here", "is", "how", "you", "can", "fix", "that", "step", "first", "then",
+         "open", "the", "settings", "page", "and", "click", "reset", "password", "account")
+
+
+@dataclass
+class MockConfig:
+    ttft: float = 0.2          # seconds before the first token
+    tokens_per_sec: float = 50.0
+    output_tokens: int = 100
+    error_rate: float = 0.0    # share of requests answered with 500 / 429
+    jitter: float = 0.1        # +/- share of random variation on ttft and token gaps
+
+
+class MockServer:
+    """
+    Serves POST .../chat/completions (streaming and non-streaming) with keep-alive,
+    so the real provider, connection pool and OpenAIChatCompletionsModel are exercised.
+    """
+
+    def __init__(self, config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.errors = 0
+        self._server = None
+        self._writers = set()
+        # Hashes of the request prefixes seen so far, to report cached prompt tokens like a real provider.
+        self._prefixes = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1/"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Keep-alive clients hold their connections open; close them so wait_closed() returns.
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _vary(self, value: float) -> float:
+        return max(value * (1 + random.uniform(-self.config.jitter, self.config.jitter)), 0.0)
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self._respond(request_line.decode(), body, writer)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, request_line: str, body: bytes, writer):
+        self.requests += 1
+        method, path, _ = request_line.split(" ", 2)
+        if method != "POST" or not path.rstrip("/").endswith("chat/completions"):
+            return self._send_json(writer, 404, {"error": {"message": f"no route {path}"}})
+        if random.random() < self.config.error_rate:
+            self.errors += 1
+            status = random.choice((429, 500))
+            return self._send_json(writer, status, {"error": {"message": "mock failure", "code": status}})
+
+        payload = json.loads(body or b"{}")
+        model = payload.get("model", "mock")
+        prompt_tokens = len(json.dumps(payload.get("messages", []))) // 4
+        cached_tokens = self._cached_tokens(payload)
+        output_tokens = min(self.config.output_tokens, payload.get("max_tokens") or self.config.output_tokens)
+        words = [random.choice(WORDS) for _ in range(output_tokens)]
+        await asyncio.sleep(self._vary(self.config.ttft))
+
+        if not payload.get("stream"):
+            await asyncio.sleep(len(words) / self.config.tokens_per_sec)
+            return self._send_json(writer, 200, {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words),
+                          "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+            })
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n")
+        gap = 1 / self.config.tokens_per_sec
+        for i, word in enumerate(words):
+            delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+            await self._send_chunk(writer, model, [{"index": 0, "delta": delta, "finish_reason": None}])
+            await asyncio.sleep(self._vary(gap))
+        await self._send_chunk(writer, model, [{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if payload.get("stream_options", {}).get("include_usage"):
+            await self._send_chunk(writer, model, [], usage={
+                "prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                "total_tokens": prompt_tokens + len(words),
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}})
+        self._write_chunked(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def _cached_tokens(self, payload) -> int:
+        """Tokens of the longest message prefix (tools included) already seen in an earlier request."""
+        tools = json.dumps(payload.get("tools", []), sort_keys=True)
+        messages = payload.get("messages", [])
+        cached = 0
+        prefix = hashlib.sha256(tools.encode())
+        for i, message in enumerate(messages):
+            prefix.update(json.dumps(message, sort_keys=True).encode())
+            digest = prefix.copy().digest()
+            if digest in self._prefixes:
+                cached = len(json.dumps(messages[:i + 1])) // 4
+            else:
+                self._prefixes.add(digest)
+        return cached
+
+    async def _send_chunk(self, writer, model, choices, usage=None):
+        chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": choices}
+        if usage is not None:
+            chunk["usage"] = usage
+        self._write_chunked(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunked(writer, data: bytes):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    @staticmethod
+    def _send_json(writer, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        reason = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock model server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--ttft", type=float, default=MockConfig.ttft, help="seconds to first token")
+    parser.add_argument("--tps", type=float, default=MockConfig.tokens_per_sec, help="tokens per second")
+    parser.add_argument("--tokens", type=int, default=MockConfig.output_tokens, help="tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    args = parser.parse_args()
+
+    async def serve():
+        config = MockConfig(ttft=args.ttft, tokens_per_sec=args.tps, output_tokens=args.tokens,
+                            error_rate=args.error_rate)
+        server = await MockServer(config, args.host, args.port).start()
+        print(f"Mock model server on {server.base_url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
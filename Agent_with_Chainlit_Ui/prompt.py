@@ -0,0 +1,86 @@
+# This code is part of the Agent with UI project.
+# Request assembly with a stable prefix, so the provider's prompt cache can be reused.
+# Providers cache the longest byte-identical *prefix* of a request. Every request is sent as
+#   1. system instructions   (canonical text, changes only on a hot-reload)
+#   2. tool schemas          (built once, sorted by name)
+#   3. history summary       (changes only when old turns are folded, see HistoryManager)
+#   4. recent turns, oldest first, then the new user message
+# Nothing that changes per turn (dates, ids, counters) may go into 1-3.
+#
+# Environment (explicit context caches, for backends that have them; read by provider.ProviderConfig):
+#   PROMPT_CACHE_HANDLE   name of a cache created on the backend, e.g. "cachedContents/abc123"
+#                         (Gemini); for OpenAI, any string used as prompt_cache_key
+#   PROMPT_CACHE_STYLE    google (default) | openai
+
+CACHE_STYLES = ("google", "openai")
+
+
+def canonical_text(text: str) -> str:
+    """
+    Same meaning, same bytes: newlines become \\n, trailing spaces and blank lines go.
+    Instructions loaded from a file edited on Windows or by a different editor stay cacheable.
+    """
+    lines = [line.rstrip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(lines).strip("\n") + "\n"
+
+
+def canonical_tools(tools: list) -> list:
+    """Tools in a fixed order (by name), so their schemas serialize the same way on every request."""
+    return sorted(tools, key=lambda tool: tool.name)
+
+
+def canonical_input(items: list) -> list:
+    """
+    History items with normalized newlines. Only line endings are touched: the content is what
+    the model said or the user typed, and the same turn must produce the same bytes next time.
+    """
+    return [
+        {**item, "content": item["content"].replace("\r\n", "\n")}
+        if isinstance(item.get("content"), str) and "\r" in item["content"] else item
+        for item in items
+    ]
+
+
+def cache_body(handle: str | None, style: str = "google") -> dict:
+    """
+    Extra JSON fields that point a chat completions request at an explicit context cache.
+    For Gemini the cache must have been created from the same instructions and tools.
+    """
+    if not handle:
+        return {}
+    if style == "google":
+        return {"extra_body": {"google": {"cached_content": handle}}}
+    if style == "openai":
+        return {"prompt_cache_key": handle}
+    raise ValueError(f"PROMPT_CACHE_STYLE must be one of {CACHE_STYLES}, not {style!r}")
+
+
+class PromptUsage:
+    """
+    Input tokens of one turn, split into the part the provider served from its cache
+    and the part it had to process. A turn may make several model calls (tool use).
+    """
+
+    __slots__ = ("input_tokens", "cached_tokens", "requests")
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.requests = 0
+
+    def record(self, usage):
+        """Adds a Responses-style usage object (what the SDK reports when a model call completes)."""
+        if usage is None:
+            return
+        self.requests += 1
+        self.input_tokens += usage.input_tokens or 0
+        details = getattr(usage, "input_tokens_details", None)
+        self.cached_tokens += (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+
+    @property
+    def uncached_tokens(self) -> int:
+        return self.input_tokens - self.cached_tokens
+
+    def to_attrs(self) -> dict:
+        """Span attributes for instrumentation.py."""
+        return {"prompt_tokens": self.input_tokens, "prompt_tokens_cached": self.cached_tokens}
@@ -0,0 +1,247 @@
+# This code is part of the Agent with UI project.
+# One shared AsyncOpenAI provider for the whole process, with a tuned HTTP connection pool.
+# Only public SDK and httpx interfaces are used: the context cache fields go through
+# chat.completions.create(extra_body=...), the pool metrics come from httpx event hooks,
+# and retries (count, backoff, Retry-After) are the SDK's own.
+
+from dataclasses import dataclass
+import importlib.util
+import logging
+import os
+import weakref
+
+import httpx
+from openai import AsyncOpenAI
+from openai.resources.chat.completions import AsyncCompletions
+
+from instrumentation import metrics
+from prompt import cache_body
+
+logger = logging.getLogger(__name__)
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+
+def _env(name, default, cast):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if cast is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return cast(value)
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    """
+    Transport settings for the provider. Every field can be set from the environment,
+    e.g. AGENT_HTTP_MAX_CONNECTIONS=400 (see from_env).
+    """
+    api_key: str | None = None
+    base_url: str = GEMINI_BASE_URL
+    # Connection pool
+    max_connections: int = 200
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    # Timeouts (seconds)
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 10.0
+    # Retries for 408/409/429/5xx and connection errors (the SDK's backoff, which honours Retry-After)
+    max_retries: int = 3
+    # Explicit context cache for chat completions requests (see prompt.py)
+    cache_handle: str | None = None
+    cache_style: str = "google"
+
+    @classmethod
+    def from_env(cls) -> "ProviderConfig":
+        return cls(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            base_url=_env("GEMINI_BASE_URL", GEMINI_BASE_URL, str),
+            max_connections=_env("AGENT_HTTP_MAX_CONNECTIONS", cls.max_connections, int),
+            max_keepalive_connections=_env("AGENT_HTTP_MAX_KEEPALIVE", cls.max_keepalive_connections, int),
+            keepalive_expiry=_env("AGENT_HTTP_KEEPALIVE_EXPIRY", cls.keepalive_expiry, float),
+            http2=_env("AGENT_HTTP2", cls.http2, bool),
+            connect_timeout=_env("AGENT_HTTP_CONNECT_TIMEOUT", cls.connect_timeout, float),
+            read_timeout=_env("AGENT_HTTP_READ_TIMEOUT", cls.read_timeout, float),
+            write_timeout=_env("AGENT_HTTP_WRITE_TIMEOUT", cls.write_timeout, float),
+            pool_timeout=_env("AGENT_HTTP_POOL_TIMEOUT", cls.pool_timeout, float),
+            max_retries=_env("AGENT_HTTP_MAX_RETRIES", cls.max_retries, int),
+            cache_handle=_env("PROMPT_CACHE_HANDLE", cls.cache_handle, str),
+            cache_style=_env("PROMPT_CACHE_STYLE", cls.cache_style, str),
+        )
+
+
+class RequestMeter:
+    """
+    Requests in flight through one httpx client, counted by its event hooks. A request is in
+    flight until its response body is closed (a streamed answer holds its connection until then),
+    or until it is garbage collected when it failed before a response.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._open = weakref.WeakKeyDictionary()  # request -> finalizer
+
+    def hooks(self) -> dict:
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+    async def on_request(self, request: httpx.Request):
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self._open[request] = weakref.finalize(request, self._finished)
+
+    async def on_response(self, response: httpx.Response):
+        finalizer = self._open.get(response.request)
+        if finalizer is not None:
+            response.stream = _ClosingStream(response.stream, finalizer)
+
+    def _finished(self):
+        self.in_flight -= 1
+
+
+class _ClosingStream(httpx.AsyncByteStream):
+    """A response body that reports to the RequestMeter when it is closed."""
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self.on_close()  # a weakref.finalize: runs once
+
+
+class _CacheCompletions(AsyncCompletions):
+    """chat.completions whose create() adds the context cache fields through its public extra_body."""
+
+    def __init__(self, client, fields: dict):
+        super().__init__(client)
+        self.fields = fields
+
+    async def create(self, *args, extra_body=None, **kwargs):
+        return await super().create(*args, extra_body={**self.fields, **(extra_body or {})}, **kwargs)
+
+
+class PooledAsyncOpenAI(AsyncOpenAI):
+    """AsyncOpenAI that owns its httpx pool, so limits, keep-alive and HTTP/2 are under our control."""
+
+    def __init__(self, config: ProviderConfig):
+        # HTTP/2 needs the optional 'h2' package (pip install "httpx[http2]").
+        http2 = config.http2 and importlib.util.find_spec("h2") is not None
+        if config.http2 and not http2:
+            logger.warning("HTTP/2 is on but the 'h2' package is missing; using HTTP/1.1")
+        timeout = httpx.Timeout(
+            connect=config.connect_timeout,
+            read=config.read_timeout,
+            write=config.write_timeout,
+            pool=config.pool_timeout,
+        )
+        self.meter = RequestMeter()
+        http_client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            event_hooks=self.meter.hooks(),
+        )
+        super().__init__(
+            api_key=config.api_key,
+            base_url=config.base_url,
+            timeout=timeout,
+            max_retries=config.max_retries,
+            http_client=http_client,
+        )
+        self.config = config
+        self.http2 = http2
+        fields = cache_body(config.cache_handle, config.cache_style)
+        if fields:
+            # Every chat completions call (the SDK makes them) carries the context cache handle.
+            self.chat.completions = _CacheCompletions(self, fields)
+
+    def pool_stats(self) -> dict:
+        """
+        Connection pool metrics:
+        - in_flight: requests sent whose response is not closed yet
+        - waiting: requests beyond max_connections, which wait for a free connection
+          (HTTP/1.1 only; HTTP/2 multiplexes them over the open connections)
+        """
+        in_flight = self.meter.in_flight
+        return {
+            "base_url": self.config.base_url,
+            "http2": self.http2,
+            "max_connections": self.config.max_connections,
+            "requests": self.meter.requests,
+            "in_flight": in_flight,
+            "peak_in_flight": self.meter.peak_in_flight,
+            "waiting": 0 if self.http2 else max(in_flight - self.config.max_connections, 0),
+        }
+
+
+# One provider per distinct config (normally just one; the model router may add more).
+_providers = {}
+
+
+def get_provider(config: ProviderConfig | None = None) -> PooledAsyncOpenAI:
+    """Returns the process-wide provider for `config` (default: from the environment), creating it on first use."""
+    config = config or ProviderConfig.from_env()
+    provider = _providers.get(config)
+    if provider is None:
+        provider = _providers[config] = PooledAsyncOpenAI(config)
+    return provider
+
+
+def pool_stats() -> list:
+    """pool_stats() of every provider created so far."""
+    return [provider.pool_stats() for provider in list(_providers.values())]
+
+
+def _pool_metrics() -> list:
+    """Prometheus lines for the connection pools, added to instrumentation's export."""
+    stats = pool_stats()
+    if not stats:
+        return []
+    lines = [
+        "# HELP agent_http_requests_total Requests sent by the provider's HTTP client.",
+        "# TYPE agent_http_requests_total counter",
+    ]
+    lines += [f'agent_http_requests_total{{base_url="{pool["base_url"]}"}} {pool["requests"]}' for pool in stats]
+    lines += [
+        "# HELP agent_http_requests_in_flight Requests whose response is not closed yet.",
+        "# TYPE agent_http_requests_in_flight gauge",
+    ]
+    lines += [f'agent_http_requests_in_flight{{base_url="{pool["base_url"]}"}} {pool["in_flight"]}' for pool in stats]
+    lines += [
+        "# HELP agent_http_pool_waiting Requests beyond max_connections, waiting for a connection (HTTP/1.1).",
+        "# TYPE agent_http_pool_waiting gauge",
+    ]
+    lines += [f'agent_http_pool_waiting{{base_url="{pool["base_url"]}"}} {pool["waiting"]}' for pool in stats]
+    lines += [
+        "# HELP agent_http_pool_http2 1 when the pool speaks HTTP/2, 0 for HTTP/1.1.",
+        "# TYPE agent_http_pool_http2 gauge",
+    ]
+    lines += [f'agent_http_pool_http2{{base_url="{pool["base_url"]}"}} {int(pool["http2"])}' for pool in stats]
+    return lines
+
+
+metrics.add_collector(_pool_metrics)
+
+
+async def close_provider():
+    while _providers:
+        _, provider = _providers.popitem()
+        await provider.close()
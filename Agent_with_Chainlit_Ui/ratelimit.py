@@ -0,0 +1,78 @@
+# This code is part of the Agent with UI project.
+# Token buckets for requests/min and tokens/min limits.
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills `rate` tokens per second.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, amount: float = 1) -> bool:
+        self._refill()
+        # A request bigger than the whole bucket would wait forever; let it drain a full bucket.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1) -> float:
+        """Seconds until `amount` tokens are available."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0) if self.rate else float("inf")
+
+    def debit(self, amount: float):
+        """Takes tokens after the fact (e.g. the real token usage was higher than estimated)."""
+        self._refill()
+        self.tokens -= amount
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        return cls(capacity=limit, rate=limit / 60)
+
+
+class RateLimiter:
+    """
+    Waits until a request fits both the requests/min and the tokens/min budget.
+    Callers are served first come, first served.
+    """
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None):
+        self.requests = TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket.per_minute(tokens_per_minute) if tokens_per_minute else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 0):
+        async with self._lock:
+            while True:
+                wait = max(
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.tokens.wait_time(tokens) if self.tokens and tokens else 0.0,
+                )
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.try_take(1)
+                    if self.tokens and tokens:
+                        self.tokens.try_take(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def record_usage(self, estimated: int, actual: int):
+        """Corrects the tokens/min bucket once the real usage of a request is known."""
+        if self.tokens and actual > estimated:
+            self.tokens.debit(actual - estimated)
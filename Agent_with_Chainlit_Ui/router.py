@@ -0,0 +1,270 @@
+# This code is part of the Agent with UI project.
+# A Model that spreads requests over several provider/model backends:
+# - each request goes to the fastest healthy backend (rolling latency and error EWMAs)
+# - hedging: if the first byte has not arrived by the backend's p95 latency,
+#   a second backend is started; the first to answer wins and the other is cancelled
+# - failover: a backend that errors before its first byte is replaced by the next one
+#
+# Configure it with MODEL_BACKENDS, a JSON list, e.g.
+#   [{"name": "gemini", "model": "gemini-2.0-flash-exp"},
+#    {"name": "backup", "model": "gemini-1.5-flash", "base_url": "https://.../openai/", "api_key_env": "BACKUP_KEY"}]
+
+from collections import deque
+from dataclasses import replace
+import asyncio
+import os
+import time
+
+from agents.models.interface import Model
+
+
+class LatencyStats:
+    """Rolling latency (EWMA plus a window for percentiles) and error rate of one call type."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 100):
+        self.alpha = alpha
+        self.ewma = None
+        self.errors = 0.0
+        self.samples = deque(maxlen=window)
+
+    def success(self, seconds: float):
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+        self.errors = (1 - self.alpha) * self.errors
+        self.samples.append(seconds)
+
+    def lower_bound(self, seconds: float):
+        """
+        A call cancelled after `seconds` (it lost a hedge): its latency was at least that.
+        Only raises the EWMA; the error rate and the percentile window (the hedge delay) keep
+        to calls that finished.
+        """
+        if self.ewma is None or seconds > self.ewma:
+            self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def failure(self):
+        self.errors = self.alpha + (1 - self.alpha) * self.errors
+
+    def percentile(self, p: float):
+        if len(self.samples) < 5:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)]
+
+
+class Backend:
+    def __init__(self, name: str, model: Model, alpha: float = 0.2):
+        self.name = name
+        self.model = model
+        # Time to first byte for streams, total time for plain responses.
+        self.first_byte = LatencyStats(alpha)
+        self.response = LatencyStats(alpha)
+        self.unhealthy_until = 0.0
+
+    def stats(self, streaming: bool) -> LatencyStats:
+        return self.first_byte if streaming else self.response
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": time.monotonic() >= self.unhealthy_until,
+            "first_byte_ewma_s": self.first_byte.ewma,
+            "response_ewma_s": self.response.ewma,
+            "error_ewma": max(self.first_byte.errors, self.response.errors),
+        }
+
+
+class _Attempt:
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.queue = asyncio.Queue()
+        self.task = None
+
+
+_DONE = object()
+
+
+class RouterModel(Model):
+    """Implements the SDK Model interface on top of several backend Models."""
+
+    def __init__(self, backends: list, hedge: bool = True, default_hedge_delay: float = 1.0,
+                 min_hedge_delay: float = 0.05, hedge_percentile: float = 95,
+                 max_error_rate: float = 0.5, cooldown: float = 30.0):
+        self.backends = [b if isinstance(b, Backend) else Backend(*b) for b in backends]
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+
+    @property
+    def model(self) -> str:
+        """
+        The backend models in configured order, e.g. "router:gemini-2.0-flash,gpt-4o-mini".
+        Stable across processes, so cache keys (cache.cache_key) match between workers and restarts.
+        """
+        return "router:" + ",".join(str(getattr(b.model, "model", b.name)) for b in self.backends)
+
+    def ranked(self, streaming: bool) -> list:
+        """Healthy backends, fastest first; unhealthy ones are kept at the end as a last resort."""
+        now = time.monotonic()
+
+        def score(backend):
+            stats = backend.stats(streaming)
+            latency = stats.ewma
+            if latency is None:
+                # A backend without data is tried first, so it gets measured, unless it only failed so far.
+                latency = self.default_hedge_delay if stats.errors else 0.0
+            return (now < backend.unhealthy_until, latency * (1 + stats.errors))
+
+        return sorted(self.backends, key=score)
+
+    def _hedge_delay(self, backend: Backend, streaming: bool) -> float:
+        p = backend.stats(streaming).percentile(self.hedge_percentile)
+        return max(p if p is not None else self.default_hedge_delay, self.min_hedge_delay)
+
+    def _record_failure(self, backend: Backend, streaming: bool):
+        stats = backend.stats(streaming)
+        stats.failure()
+        if stats.errors > self.max_error_rate:
+            backend.unhealthy_until = time.monotonic() + self.cooldown
+
+    async def get_response(self, *args, **kwargs):
+        order = self.ranked(streaming=False)
+        waiting = list(order)
+        running = {}
+        last_error = None
+
+        def launch():
+            backend = waiting.pop(0)
+
+            async def call():
+                t0 = time.monotonic()
+                try:
+                    response = await backend.model.get_response(*args, **kwargs)
+                except asyncio.CancelledError:
+                    # Lost a hedge: the time so far is a lower bound of its latency.
+                    backend.response.lower_bound(time.monotonic() - t0)
+                    raise
+                backend.response.success(time.monotonic() - t0)
+                return response
+
+            running[asyncio.create_task(call())] = backend
+
+        launch()
+        try:
+            while running:
+                timeout = None
+                if self.hedge and waiting and len(running) == 1:
+                    timeout = self._hedge_delay(next(iter(running.values())), streaming=False)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()  # hedge: the first backend is slower than usual
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    self._record_failure(backend, streaming=False)
+                if not running and waiting:
+                    launch()  # failover
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def stream_response(self, *args, **kwargs):
+        waiting = self.ranked(streaming=True)
+        attempts = []
+        signals = asyncio.Queue()
+
+        async def pump(attempt: _Attempt):
+            # The whole backend stream runs inside this one task (the SDK's spans need that).
+            backend = attempt.backend
+            t0 = time.monotonic()
+            first = True
+            try:
+                async for event in backend.model.stream_response(*args, **kwargs):
+                    if first:
+                        first = False
+                        backend.first_byte.success(time.monotonic() - t0)
+                        signals.put_nowait((attempt, None))
+                    attempt.queue.put_nowait(event)
+                attempt.queue.put_nowait(_DONE)
+            except asyncio.CancelledError:
+                if first:
+                    # Lost a hedge: the time so far is a lower bound of its first-byte latency.
+                    backend.first_byte.lower_bound(time.monotonic() - t0)
+                raise
+            except Exception as error:
+                self._record_failure(backend, streaming=True)
+                if first:
+                    signals.put_nowait((attempt, error))
+                else:
+                    attempt.queue.put_nowait(error)
+
+        def launch():
+            attempt = _Attempt(waiting.pop(0))
+            attempt.task = asyncio.create_task(pump(attempt))
+            attempts.append(attempt)
+
+        launch()
+        winner = None
+        last_error = None
+        try:
+            while winner is None:
+                # Every attempt in the list is still waiting for its first byte.
+                timeout = None
+                if self.hedge and waiting and len(attempts) == 1:
+                    timeout = self._hedge_delay(attempts[0].backend, streaming=True)
+                try:
+                    attempt, error = await asyncio.wait_for(signals.get(), timeout)
+                except asyncio.TimeoutError:
+                    launch()  # hedge: no first byte yet
+                    continue
+                if error is None:
+                    winner = attempt
+                    break
+                last_error = error
+                attempts.remove(attempt)
+                if not attempts:
+                    if not waiting:
+                        raise last_error
+                    launch()  # failover
+            # Cancel the losers; cancelling closes their HTTP streams.
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.task.cancel()
+            while True:
+                event = await winner.queue.get()
+                if event is _DONE:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            for attempt in attempts:
+                if not attempt.task.done():
+                    attempt.task.cancel()
+
+    def snapshot(self) -> list:
+        return [backend.snapshot() for backend in self.backends]
+
+
+def router_from_config(entries: list) -> RouterModel:
+    """Builds a RouterModel from MODEL_BACKENDS-style entries; each backend gets its own pooled client."""
+    from agents import OpenAIChatCompletionsModel
+    from provider import ProviderConfig, get_provider
+
+    base = ProviderConfig.from_env()
+    backends = []
+    for entry in entries:
+        config = replace(
+            base,
+            base_url=entry.get("base_url", base.base_url),
+            api_key=os.getenv(entry["api_key_env"]) if "api_key_env" in entry else base.api_key,
+        )
+        model = OpenAIChatCompletionsModel(model=entry["model"], openai_client=get_provider(config))
+        backends.append(Backend(entry.get("name", entry["model"]), model))
+    return RouterModel(backends)
@@ -0,0 +1,270 @@
+# This code is part of the Agent with UI project.
+# Admission control in front of the runner:
+# - at most max_concurrent turns talk to the model at once
+# - per-user token buckets (messages/min and tokens/min)
+# - waiting turns are served by deficit round robin across users, so a user with
+#   many queued turns cannot starve the others; a turn's cost is its estimated tokens
+# - a turn that cannot be served soon is refused with a busy message instead of timing out
+#
+# Environment:
+#   AGENT_MAX_CONCURRENT_TURNS   turns running at once (default 32)
+#   AGENT_MAX_QUEUED_TURNS       turns allowed to wait (default 200)
+#   AGENT_QUEUE_TIMEOUT          seconds a turn may wait before it is refused (default 30)
+#   AGENT_USER_RPM               messages per minute per user (default: no limit)
+#   AGENT_USER_TPM               tokens per minute per user (default: no limit)
+#   AGENT_SCHEDULER_QUANTUM      tokens of credit a user gets per round (default ANSWER_TOKEN_ESTIMATE);
+#                                below the cost of a turn, so a user with queued turns gets one per round
+
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import math
+import os
+import time
+
+from ratelimit import TokenBucket
+
+BUSY_MESSAGE = "The assistant is busy right now. Please try again in a minute."
+
+# Tokens a typical answer costs; a turn's cost is its prompt plus this.
+ANSWER_TOKEN_ESTIMATE = 500
+
+
+class Overloaded(Exception):
+    """Raised instead of running a turn; str(error) is the message to show the user."""
+
+    def __init__(self, message: str = BUSY_MESSAGE, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("user", "cost", "future", "enqueued")
+
+    def __init__(self, user, cost: int):
+        self.user = user
+        self.cost = cost
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class Scheduler:
+    """
+    Use one instance per process, from the event loop:
+
+        async with scheduler.turn(user_id, cost=estimated_tokens, on_wait=show_position):
+            ...  # run the agent
+
+    on_wait(position, waited_seconds) is awaited when the turn has to queue and then
+    every report_interval seconds until it starts; position 1 is served next.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 200, max_wait: float = 30.0,
+                 user_rpm: float | None = None, user_tpm: float | None = None,
+                 quantum: int = ANSWER_TOKEN_ESTIMATE, report_interval: float = 1.0, max_users: int = 10000):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.user_rpm = user_rpm
+        self.user_tpm = user_tpm
+        self.quantum = quantum
+        self.report_interval = report_interval
+        self.max_users = max_users
+        self.running = 0
+        self.queued = 0
+        # user -> deque of waiters, oldest first
+        self._queues = {}
+        # Users with queued turns in round-robin order, and their unspent credit (tokens).
+        self._ring = deque()
+        self._deficit = {}
+        # Whether the user at the head of the ring still has to get this round's quantum.
+        self._fresh = True
+        # Start order of the queued turns (waiter -> 1-based position), shared by every waiter's
+        # report until the queue changes; _changes counts the changes.
+        self._changes = 0
+        self._order = {}
+        self._order_changes = -1
+        # user -> (messages bucket, tokens bucket)
+        self._buckets = {}
+        self.counters = {"accepted": 0, "waited": 0, "busy": 0, "rate_limited": 0, "timed_out": 0}
+
+    @classmethod
+    def from_env(cls) -> "Scheduler":
+        def number(name, default=None):
+            value = os.getenv(name)
+            return float(value) if value else default
+
+        return cls(
+            max_concurrent=int(number("AGENT_MAX_CONCURRENT_TURNS", 32)),
+            max_queue=int(number("AGENT_MAX_QUEUED_TURNS", 200)),
+            max_wait=number("AGENT_QUEUE_TIMEOUT", 30.0),
+            user_rpm=number("AGENT_USER_RPM"),
+            user_tpm=number("AGENT_USER_TPM"),
+            quantum=int(number("AGENT_SCHEDULER_QUANTUM", ANSWER_TOKEN_ESTIMATE)),
+        )
+
+    @asynccontextmanager
+    async def turn(self, user, cost: int = 1, on_wait=None):
+        await self._admit(user, cost, on_wait)
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._dispatch()
+
+    async def _admit(self, user, cost: int, on_wait):
+        must_queue = self.running >= self.max_concurrent or self.queued > 0
+        if must_queue and self.queued >= self.max_queue:
+            self.counters["busy"] += 1
+            raise Overloaded()
+        self._take_rate(user, cost)
+        self.counters["accepted"] += 1
+        if not must_queue:
+            self.running += 1
+            return
+
+        waiter = _Waiter(user, cost)
+        self._enqueue(waiter)
+        self.counters["waited"] += 1
+        deadline = waiter.enqueued + self.max_wait
+        try:
+            while not waiter.future.done():
+                if on_wait is not None:
+                    await on_wait(self.position(waiter), time.monotonic() - waiter.enqueued)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), min(self.report_interval, remaining))
+                except asyncio.TimeoutError:
+                    if time.monotonic() >= deadline and not waiter.future.done():
+                        raise
+        except BaseException as error:
+            if waiter.future.done():
+                # The slot was granted just as we gave up: hand it on.
+                self.running -= 1
+                self._dispatch()
+            else:
+                self._remove(waiter)
+            if isinstance(error, asyncio.TimeoutError):
+                self.counters["timed_out"] += 1
+                raise Overloaded() from None
+            raise
+
+    def _take_rate(self, user, cost: int):
+        if not self.user_rpm and not self.user_tpm:
+            return
+        buckets = self._buckets.get(user)
+        if buckets is None:
+            if len(self._buckets) >= self.max_users:
+                self._forget_idle_users()
+            buckets = self._buckets[user] = (
+                TokenBucket.per_minute(self.user_rpm) if self.user_rpm else None,
+                TokenBucket.per_minute(self.user_tpm) if self.user_tpm else None,
+            )
+        requests, tokens = buckets
+        wait = max(
+            requests.wait_time(1) if requests else 0.0,
+            tokens.wait_time(cost) if tokens else 0.0,
+        )
+        if wait > 0:
+            self.counters["rate_limited"] += 1
+            raise Overloaded(
+                f"You are sending messages too quickly. Please try again in {math.ceil(wait)} s.", wait
+            )
+        if requests:
+            requests.try_take(1)
+        if tokens:
+            tokens.try_take(cost)
+
+    def _forget_idle_users(self):
+        # A full bucket holds no information; drop those users until they come back.
+        for user, buckets in list(self._buckets.items()):
+            if all(b is None or b.wait_time(b.capacity) == 0 for b in buckets):
+                del self._buckets[user]
+
+    def _enqueue(self, waiter: _Waiter):
+        queue = self._queues.get(waiter.user)
+        if queue is None:
+            queue = self._queues[waiter.user] = deque()
+            self._deficit[waiter.user] = 0
+            self._ring.append(waiter.user)
+        queue.append(waiter)
+        self.queued += 1
+        self._dispatch()
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues[waiter.user]
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue:
+            self._drop_user(waiter.user)
+        self._dispatch()
+
+    def _drop_user(self, user):
+        if self._ring[0] == user:
+            self._fresh = True
+        self._ring.remove(user)
+        del self._queues[user]
+        del self._deficit[user]
+
+    def _dispatch(self):
+        """Deficit round robin: each visit gives a user `quantum` tokens of credit to spend on turns."""
+        self._changes += 1
+        while self.running < self.max_concurrent and self._ring:
+            user = self._ring[0]
+            queue = self._queues[user]
+            if self._fresh:
+                self._deficit[user] += self.quantum
+                self._fresh = False
+            head = queue[0]
+            if head.cost <= self._deficit[user]:
+                queue.popleft()
+                self.queued -= 1
+                self._deficit[user] -= head.cost
+                self.running += 1
+                head.future.set_result(None)
+                if not queue:
+                    self._drop_user(user)
+                continue
+            # Credit used up for this round: next user.
+            self._ring.rotate(-1)
+            self._fresh = True
+
+    def position(self, waiter: _Waiter) -> int:
+        """1-based place of the waiter in the order the queued turns will start."""
+        if self._order_changes != self._changes:
+            # One pass for all waiters; the others reuse it until the queue changes.
+            self._order = {w: i for i, w in enumerate(self._start_order(), start=1)}
+            self._order_changes = self._changes
+        return self._order.get(waiter, len(self._order))
+
+    def _start_order(self):
+        """The queued waiters in the order _dispatch() will start them (a dry run of it)."""
+        queues = {user: deque(queue) for user, queue in self._queues.items()}
+        deficit = dict(self._deficit)
+        ring = deque(self._ring)
+        fresh = self._fresh
+        while ring:
+            user = ring[0]
+            queue = queues[user]
+            if fresh:
+                deficit[user] += self.quantum
+                fresh = False
+            if queue[0].cost <= deficit[user]:
+                deficit[user] -= queue[0].cost
+                yield queue.popleft()
+                if not queue:
+                    ring.popleft()
+                    fresh = True
+                continue
+            ring.rotate(-1)
+            fresh = True
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "users_waiting": len(self._ring),
+            **self.counters,
+        }
@@ -0,0 +1,241 @@
+# This code is part of the Agent with UI project.
+# Second cache tier: serves a stored answer when a new question means the same thing
+# as an old one ("how do I reset my password" vs "password reset steps").
+
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import json
+import logging
+import os
+import re
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# numpy is only needed (and only imported) when the semantic cache is turned on.
+np = None
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The semantic cache needs numpy: uv sync --extra semantic-cache "
+                              "(or pip install numpy)") from None
+        np = numpy
+    return np
+
+STOP_WORDS = frozenset(
+    "a an and are can could do does for how i in is it me my of on or please the to what when "
+    "where which why with would you your".split()
+)
+
+
+def _stem(word: str) -> str:
+    # Tiny suffix stripper: enough to match "steps"/"step" and "resetting"/"reset".
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+class HashingEmbedder:
+    """
+    Embedder that works offline and needs no model files.
+    Words (minus stop words, lightly stemmed) and their character trigrams are hashed
+    into a fixed-size vector; the result is L2-normalized so a dot product is the cosine.
+    Any object with a `dim` attribute and an `embed(texts) -> array` method can replace it.
+    """
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.3):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def _features(self, text: str):
+        words = [_stem(w) for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOP_WORDS]
+        for word in words:
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield "3:" + padded[i:i + 3], self.trigram_weight
+
+    def embed(self, texts: list):
+        _load_numpy()
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                # crc32 is stable across processes, unlike hash(), so saved vectors stay valid.
+                h = zlib.crc32(feature.encode())
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vectors[row, h % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SemanticCache:
+    """
+    Bounded vector index of past questions and their answers.
+    - lookup() returns the stored answer of the most similar question above `threshold`
+    - when full, the least recently used entry is replaced
+    - save()/load() keep the index across restarts (a .npz file plus a .json file);
+      the autosave every save_every inserts writes from a worker thread, off the event loop
+    """
+
+    def __init__(self, embedder=None, threshold: float = 0.8, max_entries: int = 5000,
+                 path: str | None = None, save_every: int = 20):
+        _load_numpy()
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+        self._vectors = np.zeros((max_entries, self.embedder.dim), dtype=np.float32)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._namespaces = np.full(max_entries, -1, dtype=np.int32)
+        self._namespace_ids = {}
+        self._entries = [None] * max_entries  # (question, answer)
+        self._count = 0
+        self._unsaved = 0
+        self._saver = None
+        self._saving = None
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path + ".npz"):
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "SemanticCache | None":
+        """SEMANTIC_CACHE=on, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_PATH."""
+        if os.getenv("SEMANTIC_CACHE", "off").lower() not in ("1", "on", "true", "yes"):
+            return None
+        cache = cls(
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000")),
+            path=os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache"),
+        )
+        # Also write the entries added since the last autosave when the process exits.
+        atexit.register(cache.save)
+        return cache
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self._namespace_ids:
+            self._namespace_ids[namespace] = len(self._namespace_ids)
+        return self._namespace_ids[namespace]
+
+    def lookup(self, namespace: str, question: str):
+        """Best stored answer for `question` among entries of the same namespace (agent), or None."""
+        ns = self._namespace_ids.get(namespace)
+        if ns is None or self._count == 0:
+            self.misses += 1
+            return None
+        vector = self.embedder.embed([question])[0]
+        scores = self._vectors[:self._count] @ vector
+        scores[self._namespaces[:self._count] != ns] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._last_used[best] = time.time()
+        return self._entries[best][1]
+
+    def add(self, namespace: str, question: str, answer: str):
+        if self._count < self.max_entries:
+            slot = self._count
+            self._count += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+        self._vectors[slot] = self.embedder.embed([question])[0]
+        self._last_used[slot] = time.time()
+        self._namespaces[slot] = self._namespace_id(namespace)
+        self._entries[slot] = (question, answer)
+        self._unsaved += 1
+        if self.path and self._unsaved >= self.save_every:
+            self.save_in_background()
+
+    def _snapshot(self):
+        n = self._count
+        # Copies: add() keeps changing the arrays while the worker thread writes.
+        return (self._vectors[:n].copy(), self._last_used[:n].copy(), self._namespaces[:n].copy(),
+                dict(self._namespace_ids), self._entries[:n])
+
+    def save_in_background(self):
+        """Snapshots the index and writes it in a worker thread, so no request waits for the disk."""
+        if self._saving is not None and not self._saving.done():
+            return  # still writing; the next autosave (or the one at exit) has the new entries
+        if self._saver is None:
+            self._saver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-cache-save")
+        snapshot = self._snapshot()
+        self._unsaved = 0
+        self._saving = self._saver.submit(self._write, *snapshot)
+        self._saving.add_done_callback(_log_save_error)
+
+    def save(self):
+        """Writes the index now, after any write still running in the background."""
+        if not self.path:
+            return
+        if self._saving is not None:
+            self._saving.result()
+        self._write(*self._snapshot())
+        self._unsaved = 0
+
+    def _write(self, vectors, last_used, namespaces, namespace_ids, entries):
+        # Write to temporary files first, so a crash never leaves a half-written index.
+        np.savez(self.path + ".tmp.npz", vectors=vectors, last_used=last_used, namespaces=namespaces)
+        with open(self.path + ".tmp.json", "w", encoding="utf-8") as f:
+            json.dump({"dim": self.embedder.dim, "namespaces": namespace_ids, "entries": entries},
+                      f, ensure_ascii=False)
+        os.replace(self.path + ".tmp.npz", self.path + ".npz")
+        os.replace(self.path + ".tmp.json", self.path + ".json")
+
+    def load(self):
+        with open(self.path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.embedder.dim:
+            return  # saved with a different embedder; start empty
+        arrays = np.load(self.path + ".npz")
+        # Keep the most recently used entries if the saved index is larger than max_entries.
+        keep = np.argsort(arrays["last_used"])[::-1][:self.max_entries]
+        n = len(keep)
+        self._vectors[:n] = arrays["vectors"][keep]
+        self._last_used[:n] = arrays["last_used"][keep]
+        self._namespaces[:n] = arrays["namespaces"][keep]
+        self._entries[:n] = [tuple(meta["entries"][i]) for i in keep]
+        self._namespace_ids = meta["namespaces"]
+        self._count = n
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._count,
+        }
+
+    def __len__(self):
+        return self._count
+
+
+def _log_save_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Semantic cache autosave failed", exc_info=future.exception())
+
+
+def standalone_question(items):
+    """
+    The user question when it is the only user turn, otherwise None.
+    A follow-up ("and for the mobile app?") depends on earlier turns, so it is never served
+    from the semantic cache.
+    """
+    if isinstance(items, str):
+        return items
+    user_turns = [item for item in items if item.get("role") == "user"]
+    if len(user_turns) != 1:
+        return None
+    return str(user_turns[0].get("content", ""))
+
@@ -0,0 +1,268 @@
+# This code is part of the Agent with UI project.
+# Where chat sessions are kept, so history survives restarts and can be shared by workers.
+#
+# Environment:
+#   SESSION_STORE            memory (default) or sqlite
+#   SESSION_STORE_PATH       SQLite file (default sessions.sqlite3)
+#   SESSION_STORE_COMPRESS   on: zlib-compress turns once they are folded into the summary
+#   SESSION_STORE_MAX_AGE_DAYS  SQLite sessions without a new turn for this long are deleted
+#                               (default: kept forever)
+#
+# A store keeps, per session:
+#   - the turns, appended one row at a time (the history is never rewritten)
+#   - the rolling summary and the id of the last turn it covers
+# Loading a session only reads the summary and the newest turns that fit the token budget.
+# Turns are history.Turn records: append() sets turn.id, and save_summary() gets the last Turn
+# the summary covers. drop(session_id) is called when the chat ends.
+# The SQLite store does its I/O in one writer thread, never on the event loop; its load() and
+# turns() block, so call them from a thread (asyncio.to_thread).
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from history import Turn
+
+logger = logging.getLogger(__name__)
+
+# How often (at most) dropping a chat also deletes the SQLite sessions older than max_age.
+PURGE_INTERVAL = 3600
+
+
+class MemorySessionStore:
+    """
+    Keeps sessions in this process only, while their chat is open: fine for one worker,
+    lost on restart. The turns are the HistoryManager's own records (not copies), and
+    turns that are folded into the summary are dropped, since prompts only need the summary.
+    """
+
+    def __init__(self):
+        # session_id -> list of Turn, oldest first
+        self._turns = {}
+        # session_id -> (summary, summary_tokens, folded_upto)
+        self._summaries = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, turn: Turn):
+        with self._lock:
+            turn.id = self._next_id
+            self._next_id += 1
+            self._turns.setdefault(session_id, []).append(turn)
+
+    def save_summary(self, session_id: str, summary: str, tokens: int, last: Turn):
+        with self._lock:
+            turns = self._turns.get(session_id)
+            if turns is None:
+                # The chat ended while its last fold was running.
+                return
+            self._summaries[session_id] = (summary, tokens, last.id)
+            self._turns[session_id] = [turn for turn in turns if turn.id > last.id]
+
+    def load(self, session_id: str, token_budget: int, min_turns: int = 0):
+        with self._lock:
+            summary, summary_tokens, _ = self._summaries.get(session_id, ("", 0, 0))
+            window = _window(reversed(self._turns.get(session_id, [])), token_budget - summary_tokens, min_turns)
+        return summary, summary_tokens, window
+
+    def drop(self, session_id: str):
+        """The chat ended: frees its turns and summary."""
+        with self._lock:
+            self._turns.pop(session_id, None)
+            self._summaries.pop(session_id, None)
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite file (WAL mode), shared by every worker on the host.
+    - Each turn is one INSERT; nothing already written is rewritten.
+    - With compress=True, turns are zlib-compressed in place once the summary covers them;
+      they stay in the file for audits and exports (see turns()).
+    - Every statement runs in one writer thread, in the order it was issued: append() and
+      save_summary() return at once, load() and turns() wait for the writes before them.
+    - With max_age (seconds), sessions without a new turn for that long are deleted;
+      without it they are kept forever.
+    """
+
+    def __init__(self, path: str = "sessions.sqlite3", compress: bool = False, compress_min_bytes: int = 256,
+                 max_age: float | None = None):
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self.max_age = max_age
+        self._last_purge = 0.0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints: a power cut may lose the last turns, never corrupt the file.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " session_id TEXT NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content BLOB NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " compressed INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " session_id TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " folded_upto INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _submit(self, fn, *args):
+        future = self._writer.submit(fn, *args)
+        future.add_done_callback(_log_write_error)
+        return future
+
+    def append(self, session_id: str, turn: Turn):
+        """Queues the INSERT; turn.id is set once it has run."""
+        self._submit(self._append, session_id, turn)
+
+    def _append(self, session_id: str, turn: Turn):
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO turns (session_id, role, content, tokens, created) VALUES (?, ?, ?, ?, ?)",
+                (session_id, turn.role, turn.content, turn.tokens, time.time()),
+            )
+            self._db.commit()
+        turn.id = cursor.lastrowid
+
+    def save_summary(self, session_id: str, summary: str, tokens: int, last: Turn):
+        # Queued after the append of `last`, so its id is known when this runs.
+        self._submit(self._save_summary, session_id, summary, tokens, last)
+
+    def _save_summary(self, session_id: str, summary: str, tokens: int, last: Turn):
+        if last.id is None:
+            return  # its INSERT failed (logged); the next fold covers these turns again
+        folded_upto = last.id
+        with self._lock:
+            row = self._db.execute(
+                "SELECT folded_upto FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            previous = row[0] if row else 0
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (session_id, summary, tokens, folded_upto, updated)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (session_id, summary, tokens, folded_upto, time.time()),
+            )
+            if self.compress:
+                # Only the turns this summary newly covers; older ones were compressed before.
+                rows = self._db.execute(
+                    "SELECT id, content FROM turns"
+                    " WHERE session_id = ? AND id > ? AND id <= ? AND compressed = 0 AND length(content) >= ?",
+                    (session_id, previous, folded_upto, self.compress_min_bytes),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE turns SET content = ?, compressed = 1 WHERE id = ?",
+                    [(zlib.compress(content.encode("utf-8")), turn_id) for turn_id, content in rows],
+                )
+            self._db.commit()
+
+    def load(self, session_id: str, token_budget: int, min_turns: int = 0):
+        """Summary plus the newest turns after it that fit token_budget, oldest first. Blocks."""
+        return self._submit(self._load, session_id, token_budget, min_turns).result()
+
+    def _load(self, session_id: str, token_budget: int, min_turns: int):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, tokens, folded_upto FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            summary, summary_tokens, folded_upto = row if row else ("", 0, 0)
+            # Newest first: the cursor stops reading as soon as the window is full.
+            cursor = self._db.execute(
+                "SELECT id, role, content, tokens, compressed FROM turns"
+                " WHERE session_id = ? AND id > ? ORDER BY id DESC",
+                (session_id, folded_upto),
+            )
+            rows = (Turn(role, _decode(content, compressed), tokens, turn_id)
+                    for turn_id, role, content, tokens, compressed in cursor)
+            window = _window(rows, token_budget - summary_tokens, min_turns)
+            cursor.close()
+        return summary, summary_tokens, window
+
+    def turns(self, session_id: str):
+        """The full history of a session, oldest first, including turns folded into the summary. Blocks."""
+        return self._submit(self._turns, session_id).result()
+
+    def _turns(self, session_id: str):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content, compressed FROM turns WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return [{"role": role, "content": _decode(content, compressed)} for role, content, compressed in rows]
+
+    def drop(self, session_id: str):
+        """
+        The chat ended; the session stays in the file, so it can be resumed later.
+        Also deletes the expired sessions, at most every PURGE_INTERVAL seconds.
+        """
+        if self.max_age is not None and time.time() - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = time.time()
+            self._submit(self.purge_expired)
+
+    def purge_expired(self):
+        """Deletes the sessions whose newest turn is older than max_age."""
+        expired = "SELECT session_id FROM turns GROUP BY session_id HAVING MAX(created) < ?"
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            self._db.execute(f"DELETE FROM summaries WHERE session_id IN ({expired})", (cutoff,))
+            self._db.execute(f"DELETE FROM turns WHERE session_id IN ({expired})", (cutoff,))
+            self._db.commit()
+
+    def close(self):
+        """Waits for the queued writes, then closes the file."""
+        self._writer.shutdown(wait=True)
+        self._db.close()
+
+
+def _log_write_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Session store write failed", exc_info=future.exception())
+
+
+def _decode(content, compressed) -> str:
+    return zlib.decompress(content).decode("utf-8") if compressed else content
+
+
+def _window(newest_first, token_budget: int, min_turns: int) -> list:
+    """
+    Takes turns from newest to oldest while they fit token_budget (but at least min_turns).
+    Unsummarized turns older than the window (e.g. a worker died mid-fold) stay out of the prompt.
+    """
+    window = []
+    used = 0
+    for turn in newest_first:
+        if len(window) >= min_turns and used + turn.tokens > token_budget:
+            break
+        window.append(turn)
+        used += turn.tokens
+    window.reverse()
+    return window
+
+
+def store_from_env():
+    """SESSION_STORE=memory|sqlite, SESSION_STORE_PATH, SESSION_STORE_COMPRESS, SESSION_STORE_MAX_AGE_DAYS."""
+    kind = os.getenv("SESSION_STORE", "memory").lower()
+    if kind == "sqlite":
+        max_age_days = os.getenv("SESSION_STORE_MAX_AGE_DAYS")
+        return SQLiteSessionStore(
+            os.getenv("SESSION_STORE_PATH", "sessions.sqlite3"),
+            compress=os.getenv("SESSION_STORE_COMPRESS", "off").lower() in ("1", "on", "true", "yes"),
+            max_age=float(max_age_days) * 86400 if max_age_days else None,
+        )
+    return MemorySessionStore()
@@ -0,0 +1,176 @@
+# This code is part of the Agent with UI project.
+# Sits between the Runner event stream and the Chainlit message:
+# many small text deltas are coalesced into fewer, larger websocket frames.
+
+from contextlib import aclosing
+from dataclasses import dataclass
+import asyncio
+import os
+import time
+
+# Marker put in a delta stream to send whatever is buffered right away (e.g. before a tool call).
+FLUSH = object()
+
+
+def cancel_run(result):
+    """
+    Stops a Runner.run_streamed run that is still going. Cancelling its task also closes
+    the HTTP stream, so the model stops generating (and billing) tokens nobody reads.
+    """
+    # The SDK has no public cancel() yet; this cancels the run and its guardrail tasks.
+    result._cleanup_tasks()
+
+
+async def text_deltas(result, on_usage=None):
+    """
+    Turns the events of Runner.run_streamed into plain text deltas (plus FLUSH markers).
+    Closing this generator early (or cancelling the reader) cancels the run.
+    on_usage(usage) is called with the token usage of every model call, when it completes.
+    """
+    try:
+        async for event in result.stream_events():
+            # Compared by type name, so this module does not need to import openai.
+            if event.type == "raw_response_event":
+                if event.data.type == "response.output_text.delta":
+                    yield event.data.delta
+                elif event.data.type == "response.completed" and on_usage is not None:
+                    on_usage(event.data.response.usage)
+            elif event.type == "run_item_stream_event" and event.item.type == "tool_call_item":
+                yield FLUSH
+    finally:
+        cancel_run(result)
+    # stream_events() ends quietly when the reading task is cancelled; pass the
+    # cancellation on, so a stopped answer is not taken for a complete one.
+    task = asyncio.current_task()
+    if task is not None and task.cancelling():
+        raise asyncio.CancelledError
+
+
+@dataclass(frozen=True)
+class FlushPolicy:
+    """
+    When buffered text is sent to the client:
+    - interval_ms: at most this long after the first buffered delta
+    - max_bytes: as soon as this much text is buffered
+    Stream end and tool calls always flush.
+    """
+    interval_ms: float = 40.0
+    max_bytes: int = 1024
+
+    @classmethod
+    def from_env(cls) -> "FlushPolicy":
+        return cls(
+            interval_ms=float(os.getenv("STREAM_FLUSH_INTERVAL_MS", cls.interval_ms)),
+            max_bytes=int(os.getenv("STREAM_FLUSH_MAX_BYTES", cls.max_bytes)),
+        )
+
+
+@dataclass
+class StreamStats:
+    """Counters for one streamed response."""
+    deltas: int = 0
+    frames: int = 0
+    bytes: int = 0
+
+
+class StreamMetrics:
+    """Totals over all responses, used to tune the flush policy."""
+
+    def __init__(self):
+        self.responses = 0
+        self.deltas = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, stats: StreamStats):
+        self.responses += 1
+        self.deltas += stats.deltas
+        self.frames += stats.frames
+        self.bytes += stats.bytes
+
+    def snapshot(self) -> dict:
+        return {
+            "responses": self.responses,
+            "frames": self.frames,
+            "deltas": self.deltas,
+            "frames_per_response": self.frames / self.responses if self.responses else 0.0,
+            "deltas_per_frame": self.deltas / self.frames if self.frames else 0.0,
+            "bytes_per_frame": self.bytes / self.frames if self.frames else 0.0,
+        }
+
+    def prometheus_lines(self) -> list:
+        """Counters for instrumentation.py's export; frames / responses is frames per response."""
+        return [
+            "# HELP agent_stream_responses_total Streamed responses.",
+            "# TYPE agent_stream_responses_total counter",
+            f"agent_stream_responses_total {self.responses}",
+            "# HELP agent_stream_frames_total Frames sent to the client (coalesced deltas).",
+            "# TYPE agent_stream_frames_total counter",
+            f"agent_stream_frames_total {self.frames}",
+            "# HELP agent_stream_deltas_total Text deltas received from the model.",
+            "# TYPE agent_stream_deltas_total counter",
+            f"agent_stream_deltas_total {self.deltas}",
+        ]
+
+
+stream_metrics = StreamMetrics()
+
+
+async def relay(deltas, send, policy: FlushPolicy | None = None) -> StreamStats:
+    """
+    Reads text deltas and calls `await send(text)` with coalesced chunks.
+    The deltas are read in the caller's task (the SDK's stream must be consumed where it
+    was started); a small timer task flushes the buffer when the model pauses mid-answer.
+    """
+    policy = policy or FlushPolicy()
+    interval = policy.interval_ms / 1000
+    stats = StreamStats()
+    buffer = []
+    size = 0
+    deadline = None
+    has_data = asyncio.Event()
+    # Serializes sends, so chunks reach the client in order.
+    send_lock = asyncio.Lock()
+
+    async def flush():
+        nonlocal buffer, size, deadline
+        async with send_lock:
+            if not buffer:
+                return
+            text = "".join(buffer)
+            buffer, size, deadline = [], 0, None
+            has_data.clear()
+            stats.frames += 1
+            await send(text)
+
+    async def timer():
+        while True:
+            await has_data.wait()
+            await asyncio.sleep(max(deadline - time.monotonic(), 0) if deadline else 0)
+            if deadline is not None and time.monotonic() >= deadline:
+                await flush()
+
+    timer_task = asyncio.create_task(timer())
+    try:
+        # Closing the deltas right away (not when they are garbage collected) stops an unfinished run.
+        async with aclosing(deltas):
+            async for item in deltas:
+                if item is FLUSH:
+                    await flush()
+                    continue
+                stats.deltas += 1
+                nbytes = len(item.encode())
+                stats.bytes += nbytes
+                buffer.append(item)
+                size += nbytes
+                if deadline is None:
+                    deadline = time.monotonic() + interval
+                    has_data.set()
+                if size >= policy.max_bytes:
+                    await flush()
+    finally:
+        timer_task.cancel()
+        # Send what we already have, even when the upstream stream failed or was stopped.
+        await flush()
+        stream_metrics.record(stats)
+    return stats
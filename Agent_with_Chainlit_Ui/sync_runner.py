@@ -0,0 +1,140 @@
+# This code is part of the Agent with UI project.
+# Runs agents from synchronous code (scripts, WSGI apps, batch jobs) on ONE long-lived
+# event loop in a background thread, instead of a new loop per call.
+# - asyncio.run() / Runner.run_sync() build and close an event loop on every call; the
+#   shared provider's kept-alive connections belong to the first loop and are wasted
+#   (or fail with "Event loop is closed") on the next one.
+# - Here every call is submitted to the same loop, so connections stay pooled.
+# - Any number of threads may call it at the same time.
+#
+#   from sync_runner import get_runner
+#   runner = get_runner()
+#   result = runner.run(agent, "Hello")            # blocks, returns the RunResult
+#   for text in runner.stream(agent, "Hello"):     # blocks per delta
+#       print(text, end="", flush=True)
+
+from concurrent.futures import CancelledError, TimeoutError
+import asyncio
+import atexit
+import queue
+import threading
+
+# Marks the end of a streamed answer in the hand-over queue.
+_DONE = object()
+
+
+class SyncRunner:
+    """A background event loop thread that sync code hands its agent runs to."""
+
+    def __init__(self, name: str = "agent-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The background loop, started on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._serve, args=(loop, ready), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _serve(loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def submit(self, coro):
+        """Schedules a coroutine on the background loop and returns a concurrent.futures.Future."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            # Waiting on the loop from its own thread would block it forever.
+            raise RuntimeError("SyncRunner was called from its own event loop; use 'await' there instead")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, coro, timeout: float | None = None):
+        """Runs a coroutine on the background loop and blocks until it is done."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except (TimeoutError, KeyboardInterrupt):
+            # The caller gave up: stop the work on the loop too (this also ends its model call).
+            future.cancel()
+            raise
+
+    def run(self, agent, input, timeout: float | None = None, **kwargs):
+        """Blocking Runner.run: returns the RunResult."""
+        from agents import Runner
+
+        return self.call(Runner.run(starting_agent=agent, input=input, **kwargs), timeout)
+
+    def stream(self, agent, input, **kwargs):
+        """
+        Blocking iterator over the text deltas of Runner.run_streamed.
+        Stopping early (break, close(), an exception in the loop body) cancels the run.
+        """
+        from streaming import text_deltas
+        from agents import Runner
+
+        deltas = queue.Queue()
+
+        async def produce():
+            # The SDK's stream is read in the task that started it, on the background loop.
+            result = Runner.run_streamed(starting_agent=agent, input=input, **kwargs)
+            try:
+                async for delta in text_deltas(result):
+                    if isinstance(delta, str):
+                        deltas.put(delta)
+            finally:
+                deltas.put(_DONE)
+
+        future = self.submit(produce())
+        try:
+            while (item := deltas.get()) is not _DONE:
+                yield item
+            # Raises the run's error, if it failed.
+            future.result()
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def close(self, timeout: float = 5.0):
+        """Closes the shared provider's connections and stops the loop thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        from provider import close_provider
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_provider(), loop).result(timeout)
+        except (TimeoutError, CancelledError):
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> SyncRunner:
+    """The process-wide SyncRunner; closed automatically at exit."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = SyncRunner()
+            atexit.register(_runner.close)
+        return _runner
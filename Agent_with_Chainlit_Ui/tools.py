@@ -0,0 +1,315 @@
+# This code is part of the Agent with UI project.
+# Function tools over the example catalog (Book, Person, Rectangle from
+# Agent_study_with_OOP_Dataclasses), so the support agent can look things up.
+# - The tools (and their JSON schemas) are built once per process, on first use.
+# - Results are memoized and dropped as soon as the catalog changes (version counter).
+# - CPU-heavy work runs in a thread pool, never on the event loop that streams tokens.
+#
+# Environment:
+#   CATALOG_EXAMPLES_DIR   folder with dataclasses.py / book_registry.py / batches.py
+#                          (default: ../Agent_study_with_OOP_Dataclasses)
+#   CATALOG_PATH           optional JSON file {"books": [...], "people": [...], "rectangles": [...]}
+#                          loaded on top of the example objects
+#   AGENT_TOOL_THREADS     threads for CPU-heavy tools (default 4)
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+import asyncio
+import hashlib
+import importlib.util
+import inspect
+import io
+import itertools
+import json
+import os
+import sys
+
+EXAMPLES_DIR = os.getenv("CATALOG_EXAMPLES_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "Agent_study_with_OOP_Dataclasses"
+)
+
+# Results with more rows than this are cut, so a tool answer never floods the prompt.
+MAX_RESULTS = 20
+# Area requests with more rectangles than this go to the thread pool.
+THREADED_AREA_THRESHOLD = 1000
+
+_examples = None
+_batches = None
+
+
+def _load(module_name: str, filename: str):
+    """Runs an example file as a module, from its path (sys.path is not changed); its demo prints are discarded."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(EXAMPLES_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+def load_examples():
+    """
+    The example module (dataclasses.py), loaded once. Its file name shadows the standard
+    library module, so it is loaded from its path under another name. Its own import of
+    book_registry is served from sys.modules, where book_registry.py is put first.
+    """
+    global _examples
+    if _examples is None:
+        import dataclasses  # noqa: F401  (the standard library one must be loaded first)
+
+        if "book_registry" not in sys.modules:
+            sys.modules["book_registry"] = _load("book_registry", "book_registry.py")
+        _examples = _load("catalog_examples", "dataclasses.py")
+    return _examples
+
+
+def load_batches():
+    """batches.py (RectangleBatch), loaded once; raises ImportError without numpy."""
+    global _batches
+    if _batches is None:
+        _batches = _load("catalog_batches", "batches.py")
+    return _batches
+
+
+class Catalog:
+    """
+    The objects the tools can see. The catalog holds them strongly (the Book registry only
+    keeps weak references) and answers book queries through the registry's indexes.
+    """
+
+    def __init__(self):
+        examples = load_examples()
+        # Books made by the catalog are only indexed by its own registry, not added to the
+        # example's global Book.library (which the tutorial scripts print).
+        self.Book = type("CatalogBook", (examples.Book,), {"__post_init__": lambda self: None})
+        self.Person, self.Rectangle = examples.Person, examples.Rectangle
+        self.registry = examples.BookRegistry()
+        self.books = []
+        self.people = []
+        self.rectangles = []
+        # Changes to people and rectangles; book changes are counted by the registry.
+        self._changes = 0
+        self._fingerprint = None  # (version, hash)
+
+    @property
+    def version(self) -> tuple:
+        return (self.registry.version, self._changes)
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the catalog's contents. Unlike `version` (a counter) it is the same in every
+        process that loaded the same data, so it can go into a shared response cache key.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            digest = hashlib.sha256()
+            for item in itertools.chain(self.books, self.people, self.rectangles):
+                digest.update(repr(item).encode())
+                digest.update(b"\n")
+            self._fingerprint = (self.version, digest.hexdigest())
+        return self._fingerprint[1]
+
+    def add_books(self, books):
+        books = list(books)
+        self.books.extend(books)
+        self.registry.add_many(books)
+
+    def add_people(self, people):
+        self.people.extend(people)
+        self._changes += 1
+
+    def add_rectangles(self, rectangles):
+        self.rectangles.extend(rectangles)
+        self._changes += 1
+
+    @classmethod
+    def from_env(cls) -> "Catalog":
+        """The example objects from dataclasses.py, plus CATALOG_PATH if it is set."""
+        catalog = cls()
+        examples = load_examples()
+        catalog.add_books([examples.book1, examples.book2])
+        catalog.add_people([examples.person1, examples.person2])
+        catalog.add_rectangles([examples.rect])
+        path = os.getenv("CATALOG_PATH")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            catalog.add_books(catalog.Book(**b) for b in data.get("books", []))
+            catalog.add_people([catalog.Person(**p) for p in data.get("people", [])])
+            catalog.add_rectangles([catalog.Rectangle(**r) for r in data.get("rectangles", [])])
+        return catalog
+
+
+_catalog = None
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog.from_env()
+    return _catalog
+
+
+def catalog_fingerprint() -> str:
+    """The data version of the catalog tools, for the response cache (cache.ResponseCache)."""
+    return get_catalog().fingerprint()
+
+
+class ToolCache:
+    """LRU memo of tool results, emptied whenever the catalog version changes."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, key):
+        if version != self._version:
+            self._data.clear()
+            self._version = version
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+tool_cache = ToolCache()
+
+_executor = None
+
+
+def _run_in_thread(fn, *args):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_TOOL_THREADS", "4")),
+                                       thread_name_prefix="agent-tool")
+    return asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def _memoized(name: str, compute, *args):
+    """Returns the cached result for (name, args) or computes it (compute may be async)."""
+    catalog = get_catalog()
+    key = (name, json.dumps(args, sort_keys=True, default=str))
+    result = tool_cache.get(catalog.version, key)
+    if result is None:
+        result = compute(catalog, *args)
+        if inspect.isawaitable(result):
+            result = await result
+        tool_cache.set(key, result)
+    return result
+
+
+def _describe(books) -> str:
+    lines = [book.description() for book in books[:MAX_RESULTS]]
+    if len(books) > MAX_RESULTS:
+        lines.append(f"... and {len(books) - MAX_RESULTS} more")
+    return "\n".join(lines) if lines else "No matching books."
+
+
+def _search_books(catalog, author, title, published_after, published_before):
+    registry = catalog.registry
+    if author:
+        books = registry.by_author(author)
+    elif title:
+        books = registry.by_title(title)
+    elif published_after is not None or published_before is not None:
+        books = registry.published_between(published_after, None if published_before is None else published_before - 1)
+    else:
+        books = list(registry)
+    books = [
+        book for book in books
+        if (not title or book.title == title)
+        and (published_after is None or book.year >= published_after)
+        and (published_before is None or book.year < published_before)
+    ]
+    return _describe(books)
+
+
+def _area_columns(lengths, widths):
+    """Area and perimeter of every rectangle: one NumPy call (batches.py), or a loop without numpy."""
+    try:
+        RectangleBatch = load_batches().RectangleBatch
+    except ImportError:
+        # numpy is an optional extra; the tool must work without it.
+        return [l * w for l, w in zip(lengths, widths)], [2 * (l + w) for l, w in zip(lengths, widths)]
+    batch = RectangleBatch(lengths, widths)
+    return batch.area().tolist(), batch.perimeter().tolist()
+
+
+def _areas(catalog, rectangles):
+    if not rectangles:
+        rectangles = [[r.length, r.width] for r in catalog.rectangles]
+    if not rectangles:
+        return "No rectangles."
+    lengths, widths = zip(*rectangles)
+    area, perimeter = _area_columns(lengths, widths)
+    unit = catalog.Rectangle.unit
+    lines = [f"{l:g} x {w:g} {unit}: area {a:g}, perimeter {p:g}"
+             for l, w, a, p in zip(lengths[:MAX_RESULTS], widths[:MAX_RESULTS], area, perimeter)]
+    if len(rectangles) > MAX_RESULTS:
+        lines.append(f"... {len(rectangles)} rectangles in total, total area {sum(area):g}")
+    return "\n".join(lines)
+
+
+def _compute_areas(catalog, rectangles):
+    if len(rectangles) > THREADED_AREA_THRESHOLD:
+        # Off the event loop (NumPy also releases the GIL for the math), so streaming goes on meanwhile.
+        return _run_in_thread(_areas, catalog, rectangles)
+    return _areas(catalog, rectangles)
+
+
+_tools = None
+
+
+def get_tools() -> list:
+    """The catalog tools, built once; the SDK derives each tool's JSON schema when it is built."""
+    global _tools
+    if _tools is None:
+        from agents import function_tool
+
+        @function_tool
+        async def search_books(author: str | None = None, title: str | None = None,
+                               published_after: int | None = None, published_before: int | None = None) -> str:
+            """
+            Searches the book catalog. Give an exact author or title, a year range, or any combination.
+
+            Args:
+                author: Exact author name, e.g. "George Orwell".
+                title: Exact book title.
+                published_after: Only books published in or after this year.
+                published_before: Only books published before this year.
+            """
+            return await _memoized("search_books", _search_books, author, title, published_after, published_before)
+
+        @function_tool
+        async def list_classics(before_year: int = 1970) -> str:
+            """
+            Lists the classic books in the catalog: those published before a year (1970 by default).
+
+            Args:
+                before_year: Books published before this year count as classics.
+            """
+            return await _memoized("search_books", _search_books, None, None, None, before_year)
+
+        @function_tool
+        async def compute_areas(rectangles: list[list[float]] | None = None) -> str:
+            """
+            Computes area and perimeter of rectangles. Without input, uses the rectangles in the catalog.
+
+            Args:
+                rectangles: [length, width] pairs.
+            """
+            return await _memoized("compute_areas", _compute_areas, rectangles or [])
+
+        _tools = [search_books, list_classics, compute_areas]
+    return _tools
@@ -1,31 +1,179 @@
 # This is a simple UI for the agent using Chainlit
 
 import chainlit as cl
-from main import stream_events
+from main import registry, get_agent, SUMMARIZER_AGENT_NAME, GUARDRAIL_AGENT_NAME
+from history import HistoryManager, agent_summarizer, count_tokens
+from streaming import FlushPolicy, relay, stream_metrics, text_deltas
+from cache import ResponseCache
+from instrumentation import metrics, timed
+from session_store import store_from_env
+from scheduler import ANSWER_TOKEN_ESTIMATE, Overloaded, Scheduler
+from prompt import PromptUsage, canonical_input
+from guardrails import GuardrailViolation, Guardrails
+from tools import catalog_fingerprint
 import asyncio
-from agents import Runner 
+import os
+
+# Older turns are folded into a summary so every prompt stays inside this many tokens.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+summarize_history = agent_summarizer(lambda: get_agent(SUMMARIZER_AGENT_NAME))
+
+# Limits how many turns run at once and queues the rest fairly across users (see scheduler.py).
+scheduler = Scheduler.from_env()
+
+# Turns and summaries are written to the session store (SESSION_STORE=memory|sqlite),
+# so a conversation can be picked up again after a restart or by another worker.
+session_store = store_from_env()
+
+# Tokens are sent to the browser in batches (every STREAM_FLUSH_INTERVAL_MS or STREAM_FLUSH_MAX_BYTES).
+FLUSH_POLICY = FlushPolicy.from_env()
+# Frames and deltas per response go into the Prometheus export, to tune the policy.
+metrics.add_collector(stream_metrics.prometheus_lines)
+
+# Repeated questions are answered from the cache (RESPONSE_CACHE=memory|sqlite|off).
+# The catalog's fingerprint is part of the key, so a catalog change is not answered from before it.
+response_cache = ResponseCache.from_env(data_version=catalog_fingerprint)
+
+# Checks every message: local checks first, the model check next to the answer (see guardrails.py).
+guardrails = Guardrails.from_env(lambda: get_agent(GUARDRAIL_AGENT_NAME))
+
+
+@cl.on_app_startup
+async def on_app_startup():
+    # Build the agents once when the app starts, not on every message (and not at import).
+    registry.build()
+
+
+async def load_history(thread_id: str) -> HistoryManager:
+    # A SQLite store reads in its writer thread; this waits for it in another one, off the event loop.
+    return await asyncio.to_thread(HistoryManager.load, session_store, thread_id,
+                                   token_budget=HISTORY_TOKEN_BUDGET, summarizer=summarize_history)
 
 
 @cl.on_chat_start
 async def on_chat_start():
-    cl.user_session.set("history",[])
+    cl.user_session.set("history", await load_history(cl.context.session.thread_id))
     await cl.Message("I am Mustafa Agent . How can i Assist you today :)").send()
-    
+
+
+@cl.on_chat_resume
+async def on_chat_resume(thread):
+    # Only called when a Chainlit data layer is configured; the history itself comes from the session store.
+    cl.user_session.set("history", await load_history(thread["id"]))
+
+@cl.on_stop
+async def on_stop():
+    await stop_turn()
+
+
+@cl.on_chat_end
+async def on_chat_end():
+    # The browser tab was closed: nobody is reading the answer any more.
+    await stop_turn()
+    # An in-memory store frees the session; a SQLite store keeps it for a later resume
+    # (until SESSION_STORE_MAX_AGE_DAYS, if set).
+    session_store.drop(cl.context.session.thread_id)
+
+
+async def stop_turn():
+    """Cancels the session's answer that is still streaming and waits until it is recorded."""
+    task = cl.user_session.get("turn_task")
+    if task is not None and task is not asyncio.current_task() and not task.done():
+        task.cancel()
+        await asyncio.wait([task])
+
+
 @cl.on_message
 async def main(message: cl.Message):
+    # A new message stops the previous answer if it is still streaming.
+    await stop_turn()
+    cl.user_session.set("turn_task", asyncio.current_task())
+    span = metrics.start_turn()
     history = cl.user_session.get("history")
     Aimsg = cl.Message(content="")
     await Aimsg.send()
 
-    user_query = message.content
-    history.append({"role": "user", "content": user_query})
+    async def show_queue(position, waited):
+        Aimsg.content = f"Waiting for a free assistant... you are number {position} in line ({waited:.0f} s)."
+        await Aimsg.update()
+
+    # Estimated tokens of this turn: the prompt plus a typical answer.
+    cost = history.tokens + count_tokens(message.content) + ANSWER_TOKEN_ESTIMATE
+    try:
+        async with scheduler.turn(user_key(), cost, on_wait=show_queue):
+            span.mark("admitted")
+            if Aimsg.content:
+                Aimsg.content = ""
+                await Aimsg.update()
+            await respond(message, history, Aimsg, span)
+    except Overloaded as busy:
+        span.set(error="Overloaded")
+        metrics.finish(span)
+        Aimsg.content = str(busy)
+        await Aimsg.update()
+
+
+def user_key():
+    """Who a turn is scheduled for: the logged-in user, or the browser session without auth."""
+    user = cl.user_session.get("user")
+    return user.identifier if user is not None else cl.context.session.id
+
+
+async def respond(message, history, Aimsg, span):
+    try:
+        # Local checks run before anything is stored or sent to the model.
+        guarded = guardrails.start(message.content, span)
+    except GuardrailViolation as violation:
+        span.set(error="GuardrailViolation", guardrail=violation.guardrail)
+        metrics.finish(span)
+        Aimsg.content = str(violation)
+        await Aimsg.update()
+        return
+    with span.phase("history"):
+        history.append("user", message.content)
+        # Stable prefix (instructions, tools, summary) first, then the turns: see prompt.py.
+        input_items = canonical_input(history.as_input())
+    with span.phase("agent_build"):
+        agent = await get_agent()
 # streaming is supported
-    response = Runner.run_streamed(
-        starting_agent=asyncio.run(stream_events()),
-        input=history,
-    )
-    async for event in response.stream_events():
-            if event.type == "raw_response_event" and hasattr(event.data, 'delta'):
-                token = event.data.delta
-                await Aimsg.stream_token(token)
-    history.append({"role": "assistant", "content": Aimsg.content})
\ No newline at end of file
+    span.mark("request")
+    usage = PromptUsage()
+    if response_cache is not None:
+        # The answer is cached only once the guardrails have passed the question.
+        deltas = response_cache.stream(agent, input_items, on_usage=usage.record, before_store=guarded.wait)
+    else:
+        from agents import Runner
+
+        response = Runner.run_streamed(starting_agent=agent, input=input_items)
+        deltas = text_deltas(response, on_usage=usage.record)
+
+    async def send(text):
+        span.mark("ttft")
+        await Aimsg.stream_token(text)
+
+    try:
+        stats = await relay(guardrails.guard(timed(deltas, span), guarded), send, FLUSH_POLICY)
+        span.set(frames=stats.frames, deltas=stats.deltas)
+    except GuardrailViolation as violation:
+        span.set(error="GuardrailViolation", guardrail=violation.guardrail)
+        # Replace whatever was shown; the refusal is what the conversation continues from.
+        Aimsg.content = str(violation)
+        await Aimsg.update()
+    except asyncio.CancelledError:
+        span.set(error="Cancelled")
+        # Keep what the user already saw, so the next prompt matches the conversation on screen.
+        if Aimsg.content:
+            history.append("assistant", Aimsg.content)
+        raise
+    except Exception as error:
+        span.set(error=type(error).__name__)
+        raise
+    finally:
+        guarded.cancel()
+        # Token counts are estimates from the history manager's tokenizer.
+        span.set(tokens_in=history.tokens, tokens_out=count_tokens(Aimsg.content))
+        if usage.requests:
+            # Reported by the provider: how much of the prompt came from its cache.
+            span.set(**usage.to_attrs())
+        metrics.finish(span)
+    history.append("assistant", Aimsg.content)
@@ -1,30 +1,49 @@
 # The Agent and Runner classes help you build AI assistants.
 # OpenAIChatCompletionsModel handles generating chat responses,
-# and AsyncOpenAI is used to make API calls to the language model.
-from agents import Agent, Runner, OpenAIChatCompletionsModel, AsyncOpenAI, set_tracing_disabled
-from dotenv import load_dotenv 
+# over the shared AsyncOpenAI provider that makes the API calls to the language model.
+# They come from the 'agents' package, which is imported inside the functions below:
+# importing this file stays fast and never loads the SDK, openai or httpx.
 import os
-import asyncio
+import sys
 
-# Load environment variables from a .env file
-load_dotenv()
+from background_loop import get_runner
 
-# Disable extra tracing/logging for cleaner output
-set_tracing_disabled(True)
+# The shared provider lives next to the Chainlit app, so both entry points use the same settings.
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_with_Chainlit_Ui")
 
 # This code is written by me to use this open-source SDK
 
-# Create an API provider with AsyncOpenAI using your API key and base URL.
-Provider = AsyncOpenAI(
-    api_key=os.getenv("GEMINI_API_KEY"),
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
+# The model is created the first time get_model() is called, not when this file is imported.
+# So importing this file (e.g. in tests) never reads .env, builds a client or calls the API.
+_model = None
 
-# Set up the chat completion model with the API provider.
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash-exp",
-    openai_client=Provider,
-)
+
+def get_model():
+    global _model
+    if _model is None:
+        from agents import OpenAIChatCompletionsModel, set_tracing_disabled
+        from dotenv import load_dotenv
+
+        if APP_DIR not in sys.path:
+            sys.path.append(APP_DIR)
+        from provider import get_provider
+
+        # Load environment variables from a .env file
+        load_dotenv()
+
+        # Disable extra tracing/logging for cleaner output
+        set_tracing_disabled(True)
+
+        # Get the shared API provider: an AsyncOpenAI client with pooled, kept-alive connections.
+        # The API key and base URL come from GEMINI_API_KEY / GEMINI_BASE_URL.
+        Provider = get_provider()
+
+        # Set up the chat completion model with the API provider.
+        _model = OpenAIChatCompletionsModel(
+            model="gemini-2.0-flash-exp",
+            openai_client=Provider,
+        )
+    return _model
 
 # ------------------------------
 # Understanding Functions:
@@ -59,45 +78,57 @@ model = OpenAIChatCompletionsModel(
 #         async for event in Runner.run_streamed(agent, input="Your query here").stream_events():
 #             if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
 #                 print(event.data.delta, end="", flush=True)
+#
+# run_sync() and asyncio.run() create a new event loop on every call and close it afterwards.
+# The shared provider keeps its connections open for reuse, but they belong to the loop that
+# opened them, so the next call cannot use them. From sync code, use the shared runner instead
+# (background_loop.py, next to this file): one background event loop for the whole program.
+#   - runner.run(agent, "...")      blocks and returns the result, like run_sync()
+#   - runner.stream(agent, "...")   a normal for-loop over the streamed text
+#   - runner.call(some_coroutine)   runs any async function on that loop
 
 # ------------------------------
-# Example using run_sync()
+# Example of a blocking (sync) run
 # ------------------------------
 def run():
+    from agents import Agent
+
     agent = Agent(
         name="Assistant", 
         instructions="You are a helpful assistant",
-        model=model
+        model=get_model()
     )
-    # run_sync runs the agent synchronously and prints the final answer.
-    result = Runner.run_sync(agent, "Tell me about Pak Army.")
+    # Like Runner.run_sync, but on the shared background loop, so the connections are reused.
+    result = get_runner().run(agent, "Tell me about Pak Army.")
     print(result.final_output) 
 
 # ------------------------------
 # Example using run() in an async function
 # ------------------------------
 async def new():
+    from agents import Agent, Runner
+
     agent = Agent(
         name="Assistant",
         instructions="You will respond to user queries.", 
-        model=model
+        model=get_model()
     )
     # run is asynchronous, so we use 'await' to get the response.
     response = await Runner.run(starting_agent=agent, input="Tell me about yourself?")
     print(response.final_output)
 
-# Run the async function
-asyncio.run(new())
-
 
 # ------------------------------
 # Example using run_streamed() for streaming responses
 # ------------------------------
 async def stream_example():
+    from agents import Agent, Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+
     agent = Agent(
         name="Assistant", 
         instructions="You will respond to user queries.", 
-        model=model
+        model=get_model()
     )
     # run_streamed returns parts of the answer as they are ready.
     result = Runner.run_streamed(starting_agent=agent, input="Tell me a short story")
@@ -105,5 +136,29 @@ async def stream_example():
         if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
             print(event.data.delta, end="", flush=True)
 
-# # Run the streaming example
-# asyncio.run(stream_example())
\ No newline at end of file
+# ------------------------------
+# Example of streaming from sync code
+# ------------------------------
+def stream_sync_example():
+    from agents import Agent
+
+    agent = Agent(
+        name="Assistant",
+        instructions="You will respond to user queries.",
+        model=get_model()
+    )
+    # A plain for-loop: each piece of text is printed as soon as it arrives.
+    for text in get_runner().stream(agent, "Tell me a short story"):
+        print(text, end="", flush=True)
+    print()
+
+# Run the examples only when this file is run directly (python Understanding_main_Point.py),
+# never when it is imported.
+if __name__ == "__main__":
+    # Run the async function on the shared loop (instead of asyncio.run, which makes a new loop each time)
+    get_runner().call(new())
+
+    # # Run the streaming example
+    # get_runner().call(stream_example())
+    # # or from sync code:
+    # stream_sync_example()
@@ -0,0 +1,84 @@
+# One long-lived event loop in a background thread, for running agents from sync code.
+# asyncio.run() and Runner.run_sync() make a new event loop on every call and close it afterwards,
+# so the provider's kept-alive connections (which belong to the loop that opened them) are lost.
+# Here every call goes to the same loop, so the connections are reused.
+#
+#   from background_loop import get_runner
+#   result = get_runner().run(agent, "Hello")          # blocks, returns the RunResult
+#   for text in get_runner().stream(agent, "Hello"):   # a normal for-loop over the streamed text
+#       print(text, end="", flush=True)
+#
+# (The Chainlit app has a fuller version of this: Agent_with_Chainlit_Ui/sync_runner.py.)
+
+import asyncio
+import atexit
+import queue
+import threading
+
+# Marks the end of a streamed answer in the hand-over queue.
+_DONE = object()
+
+
+class BackgroundLoop:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="agent-loop", daemon=True)
+        self._thread.start()
+
+    def call(self, coro, timeout: float | None = None):
+        """Runs a coroutine on the background loop and waits for its result."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def run(self, agent, input: str):
+        """Like Runner.run_sync: blocks and returns the RunResult."""
+        from agents import Runner
+
+        return self.call(Runner.run(starting_agent=agent, input=input))
+
+    def stream(self, agent, input: str):
+        """Yields the text of the answer as it arrives; stopping early cancels the run."""
+        from agents import Runner
+        from openai.types.responses import ResponseTextDeltaEvent
+
+        texts = queue.Queue()
+
+        async def produce():
+            # The SDK's stream must be read in the task that started it, so both happen here.
+            result = Runner.run_streamed(starting_agent=agent, input=input)
+            try:
+                async for event in result.stream_events():
+                    if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                        texts.put(event.data.delta)
+            finally:
+                texts.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self.loop)
+        try:
+            while (text := texts.get()) is not _DONE:
+                yield text
+            future.result()  # raises the run's error, if it failed
+        finally:
+            future.cancel()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+
+_runner = None
+_lock = threading.Lock()
+
+
+def get_runner() -> BackgroundLoop:
+    """The program's one background loop, started on first use and stopped at exit."""
+    global _runner
+    with _lock:
+        if _runner is None:
+            _runner = BackgroundLoop()
+            atexit.register(_runner.close)
+        return _runner
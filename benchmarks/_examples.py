@@ -0,0 +1,30 @@
+# Loads the Agent_study_with_OOP_Dataclasses examples for the benchmarks.
+# dataclasses.py there shadows the standard library module of the same name, so it is
+# loaded from its path under another module name, after the real 'dataclasses' is imported.
+# The examples print demo output when imported; that output is discarded.
+
+from contextlib import redirect_stdout
+import dataclasses  # noqa: F401  (the standard library one must be imported first)
+import importlib.util
+import io
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_DIR = os.path.join(os.path.dirname(HERE), "Agent_study_with_OOP_Dataclasses")
+
+
+def load_example(filename: str, module_name: str | None = None):
+    """Imports an example file, e.g. load_example("dataclasses.py"), and returns the module."""
+    module_name = module_name or "example_" + os.path.splitext(filename)[0]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    if EXAMPLES_DIR not in sys.path:
+        # Append, not insert: the example folder must not shadow the standard library.
+        sys.path.append(EXAMPLES_DIR)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(EXAMPLES_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,84 @@
+# A model for the benchmarks that answers instantly and never touches the network.
+# It implements the SDK's Model interface and emits the same event types as
+# OpenAIChatCompletionsModel, so everything above the model (Runner, streaming.py, ui.py)
+# runs its real code.
+
+from agents import Model, ModelResponse, Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseContentPartAddedEvent,
+    ResponseCreatedEvent,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails, ResponseUsage
+
+ITEM_ID = "__stub__"
+
+
+class StubModel(Model):
+    """Answers every request with `deltas` words (one text delta each)."""
+
+    def __init__(self, deltas: int = 100, word: str = "token"):
+        self.deltas = deltas
+        self.word = word
+        self.requests = 0
+
+    def _message(self, text: str) -> ResponseOutputMessage:
+        return ResponseOutputMessage(
+            id=ITEM_ID, role="assistant", type="message", status="completed",
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+        )
+
+    def _usage(self, input, output_tokens: int) -> ResponseUsage:
+        input_tokens = len(str(input)) // 4
+        return ResponseUsage(
+            input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens,
+            input_tokens_details=InputTokensDetails(cached_tokens=0),
+            output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing):
+        self.requests += 1
+        text = " ".join([self.word] * self.deltas)
+        usage = self._usage(input, self.deltas)
+        return ModelResponse(
+            output=[self._message(text)],
+            usage=Usage(requests=1, input_tokens=usage.input_tokens, output_tokens=usage.output_tokens,
+                        total_tokens=usage.total_tokens),
+            referenceable_id=None,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing):
+        self.requests += 1
+        response = Response(
+            id=ITEM_ID, created_at=0, model="stub", object="response", output=[], tool_choice="auto",
+            top_p=None, temperature=None, tools=[], parallel_tool_calls=False,
+        )
+        yield ResponseCreatedEvent(response=response, type="response.created")
+        yield ResponseOutputItemAddedEvent(
+            item=ResponseOutputMessage(id=ITEM_ID, content=[], role="assistant", type="message", status="in_progress"),
+            output_index=0, type="response.output_item.added",
+        )
+        yield ResponseContentPartAddedEvent(
+            content_index=0, item_id=ITEM_ID, output_index=0,
+            part=ResponseOutputText(text="", type="output_text", annotations=[]), type="response.content_part.added",
+        )
+        parts = []
+        for i in range(self.deltas):
+            delta = self.word if i == 0 else " " + self.word
+            parts.append(delta)
+            yield ResponseTextDeltaEvent(content_index=0, delta=delta, item_id=ITEM_ID, output_index=0,
+                                         type="response.output_text.delta")
+        message = self._message("".join(parts))
+        yield ResponseOutputItemDoneEvent(item=message, output_index=0, type="response.output_item.done")
+        final = response.model_copy()
+        final.output = [message]
+        final.usage = self._usage(input, self.deltas)
+        yield ResponseCompletedEvent(response=final, type="response.completed")
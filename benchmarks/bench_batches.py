@@ -0,0 +1,71 @@
+# RectangleBatch / PersonBatch (Agent_study_with_OOP_Dataclasses/batches.py) versus
+# calling Rectangle.area, Rectangle.perimeter and Person.calculate_birth_year in a loop.
+# Needs numpy: uv sync --extra batches (in Agent_with_Chainlit_Ui).
+#
+# Usage:
+#   python benchmarks/bench_batches.py
+#   python benchmarks/bench_batches.py --records 100000
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from _examples import load_example
+
+
+def timed(fn, repeat: int = 3) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def compare(label: str, loop, vectorized):
+    loop_s, expected = timed(loop)
+    vec_s, result = timed(vectorized)
+    assert np.allclose(np.asarray(expected), result), label
+    print(f"  {label:<14} loop {loop_s * 1e3:9.2f} ms   batch {vec_s * 1e3:8.2f} ms   {loop_s / vec_s:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized batch classes.")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    examples = load_example("dataclasses.py")
+    Rectangle, Person = examples.Rectangle, examples.Person
+    from batches import PersonBatch, RectangleBatch  # importable once the examples are loaded
+
+    rng = random.Random(7)
+    rectangles = [Rectangle(rng.uniform(1, 100), rng.uniform(1, 100)) for _ in range(args.records)]
+    people = [Person(f"Person {i}", rng.randint(0, 100)) for i in range(args.records)]
+    print(f"{args.records:,} records (best of 3)\n")
+
+    rect_batch = RectangleBatch.from_objects(rectangles)
+    person_batch = PersonBatch.from_objects(people)
+    compare("area", lambda: [r.area() for r in rectangles], rect_batch.area)
+    compare("perimeter", lambda: [Rectangle.perimeter(r.length, r.width) for r in rectangles], rect_batch.perimeter)
+    compare("birth year", lambda: [Person.calculate_birth_year(p.age, 2025) for p in people],
+            lambda: person_batch.birth_years(2025))
+
+    print("\n  conversions")
+    for label, fn in (
+        ("rectangles -> batch", lambda: RectangleBatch.from_objects(rectangles)),
+        ("batch -> rectangles", lambda: rect_batch.to_objects(Rectangle)),
+        ("people -> batch", lambda: PersonBatch.from_objects(people)),
+        ("batch -> people", lambda: person_batch.to_objects(Person)),
+    ):
+        seconds, _ = timed(fn, repeat=1)
+        print(f"  {label:<22} {seconds * 1e3:9.2f} ms")
+
+    # Round trip keeps the values.
+    assert rect_batch.to_objects(Rectangle)[:100] == rectangles[:100]
+    assert person_batch.to_objects(Person)[:100] == people[:100]
+
+
+if __name__ == "__main__":
+    main()
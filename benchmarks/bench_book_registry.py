@@ -0,0 +1,75 @@
+# BookRegistry (Agent_study_with_OOP_Dataclasses/book_registry.py) versus the old
+# class-level list, at 1M books: bulk insert, lookups by author and title, year range
+# queries, total count, and whether the books are released once nothing else uses them.
+#
+# Usage:
+#   python benchmarks/bench_book_registry.py
+#   python benchmarks/bench_book_registry.py --books 100000 --queries 200
+
+import argparse
+import gc
+import random
+import time
+
+from _examples import load_example
+
+
+def timed(label: str, fn, repeat: int = 1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    seconds = (time.perf_counter() - t0) / repeat
+    unit, value = ("ms", seconds * 1e3) if seconds >= 1e-3 else ("us", seconds * 1e6)
+    print(f"  {label:<34} {value:10.2f} {unit}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexed Book registry.")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--authors", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    Book = load_example("dataclasses.py").Book
+    from book_registry import BookRegistry  # importable once the examples are loaded
+
+    rng = random.Random(42)
+    authors = [f"Author {i}" for i in range(args.authors)]
+    # Creating a Book also adds it to Book.library; use a fresh registry for the timings.
+    Book.library = BookRegistry()
+    books = [Book(f"Title {i}", rng.choice(authors), rng.randint(1800, 2025)) for i in range(args.books)]
+    Book.library = BookRegistry()
+    query_authors = [rng.choice(authors) for _ in range(args.queries)]
+    query_titles = [f"Title {rng.randrange(args.books)}" for _ in range(args.queries)]
+    print(f"{args.books:,} books, {args.authors:,} authors, {args.queries} queries per lookup\n")
+
+    print("list (old Book.library)")
+    library = timed("bulk insert", lambda: list(books))
+    timed("by author (scan)", lambda: [[b for b in library if b.author == a] for a in query_authors[:5]], 1)
+    timed("by title (scan)", lambda: [[b for b in library if b.title == t] for t in query_titles[:5]], 1)
+    timed("published before 1970 (scan)", lambda: [b for b in library if b.year < 1970])
+    timed("total", lambda: len(library), 1000)
+    print("  (scans are timed for 5 queries)")
+
+    print("\nBookRegistry")
+    registry = BookRegistry()
+    timed("bulk insert (add_many)", lambda: registry.add_many(books))
+    timed(f"by author x{args.queries}", lambda: registry.by_authors(query_authors))
+    timed(f"by title x{args.queries}", lambda: registry.by_titles(query_titles))
+    timed("published before 1970", lambda: registry.published_before(1970))
+    timed("count before 1970", lambda: registry.count_before(1970), 1000)
+    timed("total", lambda: registry.total(), 1000)
+    timed("new Book (added to Book.library)", lambda: Book("Extra", "Someone", 1999), 1000)
+
+    classics = sum(1 for b in books if b.year < 1970)
+    assert registry.count_before(1970) == classics == len(registry.published_before(1970))
+
+    # Dropping the books: the old list would keep all of them alive, the registry lets them go.
+    del library
+    del books
+    gc.collect()
+    print(f"\nAfter dropping every other reference: {registry.total()} books left in the registry")
+
+if __name__ == "__main__":
+    main()
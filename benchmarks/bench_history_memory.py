@@ -0,0 +1,76 @@
+# Memory used by chat history records: the old per-turn dicts versus history.Turn.
+# Builds the same sessions both ways and measures the allocations with tracemalloc.
+# Message texts are created before measuring, so only the per-turn overhead is compared.
+#
+# Usage:
+#   python benchmarks/bench_history_memory.py
+#   python benchmarks/bench_history_memory.py --sessions 5000 --turns 40
+
+from collections import deque
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "Agent_with_Chainlit_Ui"))
+
+from history import Turn  # noqa: E402
+
+
+def fresh(text: str) -> str:
+    # A new, non-interned copy, like a role string read back from the session store.
+    return "".join(list(text))
+
+
+def dict_history(rows) -> deque:
+    """The previous layout: ({"role", "content"} dict, tokens, store id) tuples."""
+    return deque(({"role": role, "content": content}, tokens, turn_id) for turn_id, role, content, tokens in rows)
+
+
+def turn_history(rows) -> deque:
+    return deque(Turn(role, content, tokens, turn_id) for turn_id, role, content, tokens in rows)
+
+
+def measure(build, sessions: list) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(rows) for rows in sessions]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of history records.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    sessions = [
+        [(s * args.turns + t, fresh("user" if t % 2 == 0 else "assistant"), f"message {s}-{t} " * 8, 30)
+         for t in range(args.turns)]
+        for s in range(args.sessions)
+    ]
+    total_turns = args.sessions * args.turns
+    results = {}
+    for name, build in (("dict", dict_history), ("Turn", turn_history)):
+        used = measure(build, sessions)
+        results[name] = used
+        print(f"{name:>5}: {used / 2**20:8.1f} MiB  {used / total_turns:6.1f} bytes/turn")
+    saved = 1 - results["Turn"] / results["dict"]
+    print(f"Turn records use {saved:.0%} less memory than dicts ({args.sessions} sessions x {args.turns} turns)")
+
+    # The dicts the SDK needs are now built per prompt; this is what that costs.
+    history = turn_history(sessions[0])
+    t0 = time.perf_counter()
+    for _ in range(10000):
+        [turn.to_input() for turn in history]
+    per_prompt = (time.perf_counter() - t0) / 10000
+    print(f"to_input() for a {args.turns}-turn prompt: {per_prompt * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Import-time guard for the agent entry points.
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter for every module
+# listed in import_time_budget.json (from app_dir, or the folder given in module_dirs) and fails when:
+# - the cumulative import time (median of several runs) is over the module's budget, or
+# - the import pulled in a heavy module (agents, openai, numpy, ...) that should load lazily.
+#
+# Usage:
+#   python benchmarks/bench_import_time.py            # check against the budgets
+#   python benchmarks/bench_import_time.py --runs 9   # more runs, less noise
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+
+def import_time_us(module: str, cwd: str) -> int:
+    """Cumulative import time of `module` in microseconds, as reported by -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    for line in reversed(proc.stderr.splitlines()):
+        # Format: "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def heavy_imports(module: str, cwd: str, heavy: list) -> list:
+    code = f"import sys, {module}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+    return [m for m in proc.stdout.strip().split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import times against budgets.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=os.path.join(HERE, "import_time_budget.json"))
+    args = parser.parse_args()
+
+    with open(args.budget, encoding="utf-8") as f:
+        config = json.load(f)
+    module_dirs = config.get("module_dirs", {})
+
+    failures = []
+    for module, budget_ms in config["budgets_ms"].items():
+        cwd = os.path.join(ROOT, module_dirs.get(module, config["app_dir"]))
+        median_ms = statistics.median(import_time_us(module, cwd) for _ in range(args.runs)) / 1000
+        heavy = heavy_imports(module, cwd, config["heavy_modules"])
+        status = "ok"
+        if median_ms > budget_ms:
+            status = "SLOW"
+            failures.append(f"{module}: {median_ms:.1f} ms > {budget_ms} ms")
+        if heavy:
+            status = "HEAVY"
+            failures.append(f"{module}: imports {', '.join(heavy)} eagerly")
+        print(f"{module:<26} {median_ms:8.1f} ms  (budget {budget_ms} ms)  {status}")
+
+    if failures:
+        print("\nImport-time regressions:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# Benchmark suite for the agent request path, fully offline (the model is a stub, see _stub_model.py):
+# - agent construction
+# - history serialization at 10 / 100 / 1000 turns
+# - stream handling: text deltas through ui.py's on_message handler, per second
+# - Book registry inserts and lookups
+# - dataclass vs plain-class instantiation (dataclasses.py vs simple_oop.py)
+# Results are compared with a saved baseline; a benchmark more than --threshold slower fails the run.
+# The baseline is machine specific: save one on the machine that runs the comparison.
+#
+# Usage:
+#   python benchmarks/bench_suite.py --save          # record the baseline (bench_baseline.json)
+#   python benchmarks/bench_suite.py                 # compare with it; exit code 1 on a regression
+#   python benchmarks/bench_suite.py -k history      # only the benchmarks whose name contains "history"
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "Agent_with_Chainlit_Ui"))
+
+# Set before the app modules are imported: no response cache, no API key needed.
+os.environ["RESPONSE_CACHE"] = "off"
+os.environ["SESSION_STORE"] = "memory"
+os.environ.setdefault("GEMINI_API_KEY", "stub")
+
+from _examples import load_example  # noqa: E402
+from _stub_model import StubModel  # noqa: E402
+
+BASELINE = os.path.join(HERE, "bench_baseline.json")
+
+# name -> (setup function, units per call or None); setup returns the function to time.
+BENCHMARKS = {}
+# Objects the timed functions need alive (the Book registry only holds weak references).
+_keep_alive = []
+
+
+def benchmark(name: str, units: int | None = None):
+    """Registers a setup function. `units` (e.g. stream events per call) adds a per-second column."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, units)
+        return setup
+
+    return register
+
+
+# ---------- agent ----------
+
+def stub_app(deltas: int = 100):
+    """main.py with the stub model in place of the real one."""
+    import main
+
+    main.setup()
+    main._model = StubModel(deltas)
+    return main
+
+
+@benchmark("agent.build_support")
+def bench_build_support():
+    main = stub_app()
+    instructions = main.load_instructions()
+    return lambda: main.build_support_agent(instructions)
+
+
+@benchmark("agent.registry_get")
+def bench_registry_get():
+    main = stub_app()
+    main.registry.build()
+    return main.registry.get
+
+
+# ---------- history ----------
+
+def history_with(turns: int):
+    from history import HistoryManager
+
+    rng = random.Random(turns)
+    words = ("account", "password", "invoice", "refund", "settings", "error", "please", "thanks", "when", "the")
+    history = HistoryManager(token_budget=10**9)
+    for i in range(turns):
+        history.append("user" if i % 2 == 0 else "assistant", " ".join(rng.choice(words) for _ in range(60)))
+    return history
+
+
+def bench_history(turns: int):
+    from prompt import canonical_input
+
+    history = history_with(turns)
+    # What every turn does with the history: build the input items and serialize them for the request.
+    return lambda: json.dumps(canonical_input(history.as_input()))
+
+
+for _turns in (10, 100, 1000):
+    benchmark(f"history.serialize_{_turns}")(lambda turns=_turns: bench_history(turns))
+
+
+# ---------- stream handling ----------
+
+STREAM_DELTAS = 200
+
+
+@benchmark("stream.on_message", units=STREAM_DELTAS)
+def bench_on_message():
+    stub_app(STREAM_DELTAS)
+    import ui
+    from loadtest import FakeMessage, _session_data, fake_chainlit
+
+    ui.cl = fake_chainlit()
+    sessions = itertools.count()
+
+    async def turn():
+        # A new chat every time: the history stays short and no summary folding runs in the
+        # background, so only the stream path is measured.
+        _session_data.set({"id": f"bench-{next(sessions)}"})
+        await ui.on_chat_start()
+        await ui.main(FakeMessage("How do I reset my password?"))
+
+    return turn
+
+
+# ---------- Book registry ----------
+
+def make_books(count: int):
+    """count dataclass Books, their authors, and the BookRegistry class."""
+    Book = load_example("dataclasses.py").Book
+    from book_registry import BookRegistry  # importable once the examples are loaded
+
+    rng = random.Random(42)
+    authors = [f"Author {i}" for i in range(count // 50 or 1)]
+    books = [Book(f"Title {i}", rng.choice(authors), rng.randint(1800, 2025)) for i in range(count)]
+    # Creating the books added them to Book.library; the benchmarks use their own registries.
+    Book.library = BookRegistry()
+    return books, authors, BookRegistry
+
+
+@benchmark("book_registry.add_many_10k")
+def bench_registry_insert():
+    books, _, BookRegistry = make_books(10_000)
+    return lambda: BookRegistry().add_many(books)
+
+
+@benchmark("book_registry.by_author_x100")
+def bench_registry_by_author():
+    books, authors, BookRegistry = make_books(100_000)
+    registry = BookRegistry()
+    registry.add_many(books)
+    queries = random.Random(1).sample(authors, 100)
+    _keep_alive.append(books)
+    return lambda: registry.by_authors(queries)
+
+
+@benchmark("book_registry.published_before_1820")
+def bench_registry_range():
+    books, _, BookRegistry = make_books(100_000)
+    registry = BookRegistry()
+    registry.add_many(books)
+    _keep_alive.append(books)
+    return lambda: registry.published_before(1820)
+
+
+# ---------- dataclass vs plain class ----------
+
+def bench_instantiation(filename: str, kind: str):
+    module = load_example(filename)
+    if kind == "book":
+        from book_registry import BookRegistry
+
+        # A registry of its own, so both versions start from an empty library.
+        module.Book.library = BookRegistry()
+        return lambda: [module.Book("Title", "Author", 1999) for _ in range(1000)]
+    if kind == "rectangle":
+        return lambda: [module.Rectangle(5.0, 3.0) for _ in range(1000)]
+    return lambda: [module.Person("Alice", 30) for _ in range(1000)]
+
+
+for _kind in ("book", "rectangle", "person"):
+    benchmark(f"oop.{_kind}_x1000_dataclass")(lambda kind=_kind: bench_instantiation("dataclasses.py", kind))
+    benchmark(f"oop.{_kind}_x1000_plain")(lambda kind=_kind: bench_instantiation("simple_oop.py", kind))
+
+
+# ---------- runner ----------
+
+def measure(fn, loop, min_time: float, repeat: int) -> list:
+    """
+    Seconds per call for `repeat` samples; each sample runs enough calls to last min_time.
+    Like timeit, the garbage collector is paused while a sample runs, so a collection
+    triggered by an earlier benchmark does not land in this one.
+    """
+    if asyncio.iscoroutinefunction(fn):
+        async def calls(n):
+            for _ in range(n):
+                await fn()
+
+        def run(n):
+            loop.run_until_complete(calls(n))
+    else:
+        def run(n):
+            for _ in range(n):
+                fn()
+
+    run(1)  # warm-up: lazy imports, caches, first-call costs
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        run(number)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            run(number)
+            samples.append((time.perf_counter() - t0) / number)
+        finally:
+            gc.enable()
+    return samples
+
+
+def fmt(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the agent request path.")
+    parser.add_argument("-k", dest="filter", default="", help="only benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown that counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per sample")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        if not args.save and saved.get("machine") != machine():
+            print(f"Note: the baseline was recorded on {saved.get('machine')}, "
+                  "not this machine; expect differences.\n")
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<36} {'best':>12}  {'median':>12}  {'rate':>15}  vs baseline")
+    for name, (setup, units) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        try:
+            fn = setup()
+        except ImportError as error:
+            # e.g. chainlit for the on_message benchmark; run the suite from the app's environment.
+            print(f"{name:<36} skipped: {error}")
+            continue
+        samples = measure(fn, loop, args.min_time, args.repeat)
+        if name in baseline and min(samples) > baseline[name] * (1 + args.threshold):
+            # Looks slower: measure again before calling it a regression (a busy machine is not one).
+            samples += measure(fn, loop, args.min_time, args.repeat)
+        # The best sample is the least disturbed by other processes, so it is the one compared.
+        best = min(samples)
+        results[name] = best
+        rate = f"{units / best:12,.0f} /s" if units else " " * 15
+        status = ""
+        if name in baseline:
+            change = best / baseline[name] - 1
+            status = f"{change:+7.1%}"
+            if change > args.threshold:
+                status += "  REGRESSION"
+                regressions.append(f"{name}: {fmt(best).strip()} vs {fmt(baseline[name]).strip()} ({change:+.0%})")
+        print(f"{name:<36} {fmt(best)}  {fmt(statistics.median(samples))}  {rate}  {status}")
+    loop.close()
+
+    if args.save:
+        # Keep the baseline of benchmarks that were filtered out this time.
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine(), "results": {**baseline, **results}}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif regressions:
+        print(f"\nRegressions (slower than the baseline by more than {args.threshold:.0%}):\n  "
+              + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()